@@ -0,0 +1,144 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from app.repositories.base import ListingFilters, ROLLUP_FIELDS
+
+def utc_naive(value: datetime) -> datetime:
+    # Stored times are naive UTC; request times may carry an offset
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def booking_hours(start: datetime, end: datetime) -> float:
+    return (utc_naive(end) - utc_naive(start)).total_seconds() / 3600
+
+def split_by_day(start: datetime, end: datetime) -> List[Tuple[str, float]]:
+    """(UTC day, hours) for each day the interval [start, end) covers."""
+    start, end = utc_naive(start), utc_naive(end)
+    segments = []
+    while start < end:
+        midnight = datetime.combine(start.date() + timedelta(days=1), time())
+        segment_end = min(end, midnight)
+        segments.append((start.date().isoformat(), (segment_end - start).total_seconds() / 3600))
+        start = segment_end
+    return segments
+
+def booking_rollups(booking: dict, event: str) -> List[dict]:
+    """Rollup increments for one booking ``event``: created, cancelled or completed.
+
+    A booking counts (bookings, completed, cancelled) on its start day. Its hours and
+    revenue are spread over the days it covers, so occupancy per day stays exact.
+    """
+    segments = split_by_day(booking["start_time"], booking["end_time"])
+    if not segments:
+        return []
+    base = {"listing_id": booking["listing_id"], "owner_id": booking["owner_id"]}
+    first_day = segments[0][0]
+    if event == "completed":
+        return [{**base, "day": first_day, "completed": 1}]
+
+    sign = 1 if event == "created" else -1
+    total_hours = sum(hours for _, hours in segments)
+    amount = booking.get("amount") or 0
+    rows = []
+    for day, hours in segments:
+        row = {**base, "day": day, "hours": sign * hours, "revenue": sign * amount * hours / total_hours}
+        if day == first_day:
+            row["bookings"] = sign
+            if event == "cancelled":
+                row["cancelled"] = 1
+        rows.append(row)
+    return rows
+
+async def record_booking_events(repos, bookings: List[dict], event: str):
+    """Apply ``event`` for ``bookings`` to the rollups. Rollups are derived data, so a
+    failure is logged rather than failing the booking write; rebuild_analytics.py repairs drift."""
+    try:
+        rows = []
+        for booking in bookings:
+            if not booking.get("owner_id"):
+                # Bookings made before owners were recorded on them
+                listing = await repos.listings.get(booking["listing_id"])
+                if listing is None:
+                    continue
+                booking = {**booking, "owner_id": listing["owner_id"]}
+            rows.extend(booking_rollups(booking, event))
+        await repos.analytics.apply(rows)
+    except Exception as e:
+        print(f"⚠️ Analytics rollup update ({event}) failed: {type(e).__name__}: {e}")
+
+async def rebuild_rollups(repos) -> Tuple[int, int]:
+    """Recompute every rollup from raw bookings; returns (bookings read, rollups written)."""
+    listings = {}
+    async for listing in repos.listings.stream(ListingFilters()):
+        listings[listing["_id"]] = (listing["owner_id"], listing["price_per_hour"])
+
+    totals: Dict[Tuple[str, str], dict] = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    count = 0
+    async for booking in repos.bookings.stream_all():
+        owner_id, price = listings.get(booking["listing_id"], (booking.get("owner_id"), None))
+        owner_id = booking.get("owner_id") or owner_id
+        if owner_id is None:
+            # Listing deleted and the booking predates recorded owners
+            continue
+        amount = booking.get("amount")
+        if amount is None and price is not None:
+            amount = price * booking_hours(booking["start_time"], booking["end_time"])
+        booking = {**booking, "owner_id": owner_id, "amount": amount}
+        events = ["created"] + {"cancelled": ["cancelled"], "completed": ["completed"]}.get(booking.get("status"), [])
+        for event in events:
+            for row in booking_rollups(booking, event):
+                total = totals[(row["listing_id"], row["day"])]
+                total.update(listing_id=row["listing_id"], owner_id=row["owner_id"], day=row["day"])
+                for field in ROLLUP_FIELDS:
+                    total[field] += row.get(field, 0)
+        count += 1
+
+    await repos.analytics.replace_all(list(totals.values()))
+    return count, len(totals)
+
+# One worker builds the missing rollups on startup; the others skip it
+BACKFILL_LEASE = "analytics_backfill"
+BACKFILL_LEASE_SECONDS = 600
+
+async def backfill_rollups(repos, holder: str) -> Optional[Tuple[int, int]]:
+    """Build the rollups from bookings when there are bookings but no rollups yet (first
+    start after upgrading). Until then, cancelling a booking made before the upgrade would
+    subtract it from days that never counted it. Returns rebuild_rollups' counts, or None."""
+    if await repos.analytics.exists():
+        return None
+    async for _ in repos.bookings.stream_all():
+        break
+    else:
+        return None
+    if not await repos.acquire_lease(BACKFILL_LEASE, holder, BACKFILL_LEASE_SECONDS):
+        return None
+    # Another worker may have finished the backfill before this one took the lease
+    if await repos.analytics.exists():
+        return None
+    return await rebuild_rollups(repos)
+
+def summarize(rows: List[dict], first_day: date, last_day: date) -> List[dict]:
+    """Group rollup rows by listing with per-day occupancy and range totals."""
+    days_in_range = (last_day - first_day).days + 1
+    listings: Dict[str, dict] = {}
+    for row in rows:
+        entry = listings.get(row["listing_id"])
+        if entry is None:
+            entry = listings[row["listing_id"]] = {
+                "listing_id": row["listing_id"], "totals": dict.fromkeys(ROLLUP_FIELDS, 0), "days": []
+            }
+        # Counters a rollup never received are absent on Mongo ($inc only sets what it adds)
+        day = {"day": row["day"], **{field: row.get(field, 0) for field in ROLLUP_FIELDS}}
+        day["hours"] = round(day["hours"], 2)
+        day["revenue"] = round(day["revenue"], 2)
+        day["occupancy"] = round(row.get("hours", 0) / 24, 4)
+        entry["days"].append(day)
+        for field in ROLLUP_FIELDS:
+            entry["totals"][field] += row.get(field, 0)
+    for entry in listings.values():
+        totals = entry["totals"]
+        totals["occupancy"] = round(totals["hours"] / (24 * days_in_range), 4)
+        totals["hours"] = round(totals["hours"], 2)
+        totals["revenue"] = round(totals["revenue"], 2)
+    return list(listings.values())
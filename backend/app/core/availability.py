@@ -0,0 +1,124 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.repositories.base import ListingFilters, LISTING_SORTS, Page
+from .analytics import utc_naive
+from .config import settings
+from .pagination import clamp_limit, encode_cursor
+
+# Occupancy is kept per listing per UTC day as a bitmap with one bit per minute
+# (bit i = minutes i..i+1 after midnight). A booking sets every minute it touches, so
+# bookings and windows that only share a partial minute count as overlapping.
+SLOTS_PER_DAY = 24 * 60
+SLOT_BYTES = SLOTS_PER_DAY // 8
+# Mongo stores a day as 24 hourly words (bits 0-59) so $bit can update them atomically
+HOUR_WORD = (1 << 60) - 1
+
+def occupancy_cutoff(now: datetime) -> str:
+    """First day whose bitmaps are kept: yesterday still matters to windows under way."""
+    return (now - timedelta(days=1)).strftime("%Y-%m-%d")
+
+def slot_masks(start: datetime, end: datetime) -> Dict[str, int]:
+    """Day (YYYY-MM-DD) -> bitmask of the minute slots that [start, end) touches."""
+    start, end = utc_naive(start), utc_naive(end)
+    masks = {}
+    day_start = datetime(start.year, start.month, start.day)
+    while day_start < end:
+        day_end = day_start + timedelta(days=1)
+        first = int((max(start, day_start) - day_start).total_seconds() // 60)
+        last = math.ceil((min(end, day_end) - day_start).total_seconds() / 60)
+        if last > first:
+            masks[day_start.strftime("%Y-%m-%d")] = ((1 << (last - first)) - 1) << first
+        day_start = day_end
+    return masks
+
+def shared_slots(masks: Dict[str, int], others) -> Dict[str, int]:
+    """Of the slots in ``masks``, those the [start, end) intervals ``others`` also touch.
+
+    Bookings may meet inside a minute (one ends 10:00:30, the next starts then), so both
+    hold that minute's slot; cancelling one must keep the slots its neighbours still hold.
+    """
+    shared: Dict[str, int] = defaultdict(int)
+    for start, end in others:
+        for day, mask in slot_masks(start, end).items():
+            if day in masks:
+                shared[day] |= mask & masks[day]
+    return {day: mask for day, mask in shared.items() if mask}
+
+def neighbour_window(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """Bookings overlapping this window are the only ones that can share a slot with [start, end)."""
+    return utc_naive(start) - timedelta(minutes=1), utc_naive(end) + timedelta(minutes=1)
+
+def hour_words(mask: int) -> Dict[str, int]:
+    return {str(hour): (mask >> (60 * hour)) & HOUR_WORD for hour in range(24) if (mask >> (60 * hour)) & HOUR_WORD}
+
+def from_hour_words(words: Dict[str, int]) -> int:
+    return sum(int(word) << (60 * int(hour)) for hour, word in words.items())
+
+def availability_window(start: Optional[datetime], end: Optional[datetime]) -> bool:
+    """Validate the optional start/end search window; returns whether one was given."""
+    if start is None and end is None:
+        return False
+    if start is None or end is None:
+        raise HTTPException(status_code=400, detail="start and end must be given together")
+    # Offset-aware and naive times cannot be compared directly
+    start, end = utc_naive(start), utc_naive(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="end must be in the future")
+    if (end - start).total_seconds() > settings.AVAILABILITY_MAX_HOURS * 3600:
+        raise HTTPException(status_code=400, detail=f"Windows cover at most {settings.AVAILABILITY_MAX_HOURS} hours")
+    return True
+
+async def browse_available(repos, filters: ListingFilters, sort: str, limit: Optional[int], cursor: Optional[str],
+                           start: datetime, end: datetime) -> Page:
+    """A browse page of listings without an active booking overlapping [start, end).
+
+    Listings are fetched in sort order and each fetched page is checked against the slot
+    bitmaps with one query, so every listing examined costs one bitmap per day of the
+    window however many bookings it has. At most AVAILABILITY_MAX_SCAN listings are
+    examined per request; a short page still carries a cursor while more remain.
+    """
+    limit = clamp_limit(limit)
+    masks = slot_masks(start, end)
+    available, scanned, batch = [], 0, limit
+    while True:
+        page, next_cursor = await repos.listings.browse(filters, sort, min(batch, settings.AVAILABILITY_MAX_SCAN - scanned), cursor)
+        busy = await repos.bookings.busy_listings([listing["_id"] for listing in page], masks)
+        for position, listing in enumerate(page):
+            scanned += 1
+            if listing["_id"] not in busy:
+                available.append(listing)
+            if len(available) == limit or scanned >= settings.AVAILABILITY_MAX_SCAN:
+                more = position < len(page) - 1 or next_cursor is not None
+                return available, encode_cursor(LISTING_SORTS[sort], listing) if more else None
+        if next_cursor is None:
+            return available, None
+        cursor = next_cursor
+        # Mostly booked results: widen the next fetch
+        batch = clamp_limit(batch * 2)
+
+async def search_available(repos, q: str, filters: ListingFilters, limit: Optional[int], start: datetime, end: datetime) -> List[dict]:
+    """The best ``limit`` free-text matches that are free over [start, end), drawn from
+    the top AVAILABILITY_MAX_SCAN matches."""
+    listings = await repos.listings.search(q, filters, settings.AVAILABILITY_MAX_SCAN)
+    busy = await repos.bookings.busy_listings([listing["_id"] for listing in listings], slot_masks(start, end))
+    return [listing for listing in listings if listing["_id"] not in busy][:clamp_limit(limit)]
+
+async def rebuild_occupancy(repos) -> Tuple[int, int]:
+    """Recompute the slot bitmaps from active bookings; returns (bookings, bitmaps written)."""
+    bitmaps: Dict[Tuple[str, str], int] = defaultdict(int)
+    cutoff = occupancy_cutoff(datetime.utcnow())
+    count = 0
+    async for booking in repos.bookings.stream_all():
+        if booking.get("status") != "active":
+            continue
+        for day, mask in slot_masks(booking["start_time"], booking["end_time"]).items():
+            if day >= cutoff:
+                bitmaps[(booking["listing_id"], day)] |= mask
+        count += 1
+    await repos.bookings.replace_occupancy(dict(bitmaps))
+    return count, len(bitmaps)
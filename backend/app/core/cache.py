@@ -0,0 +1,102 @@
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from .config import settings
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire ``ttl`` seconds after being set.
+
+    Only touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+class CacheBackend:
+    """Storage used by the response cache. Async so that a shared store (e.g. Redis)
+    can implement the same interface later."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any):
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process backend. Entries and generation counters both live in TTLCaches, so
+    memory stays bounded however many scopes (e.g. ``listing:<id>``) get written.
+
+    A missing counter (never set, expired or evicted) starts a new generation drawn
+    from a process-wide sequence rather than 0, so it can never fall back to a
+    generation that older entries were stored under.
+
+    Nothing is shared between workers: after a write, other workers keep serving
+    their cached pages (and ETags) for up to the TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.counters = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = itertools.count(1)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: Any):
+        self.entries.set(key, value)
+
+    async def get_counter(self, key: str) -> int:
+        generation = self.counters.get(key)
+        if generation is None:
+            generation = await self.incr(key)
+        return generation
+
+    async def incr(self, key: str) -> int:
+        generation = next(self._generations)
+        self.counters.set(key, generation)
+        return generation
+
+def create_cache_backend(name: str, maxsize: int, ttl: float) -> CacheBackend:
+    if name == "memory":
+        return InMemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+# Authenticated user documents keyed by the JWT "sub" claim (see app/deps.py)
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
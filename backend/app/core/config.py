@@ -6,9 +6,70 @@ load_dotenv()
 
 class Settings(BaseSettings):
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-    DATABASE_URL: str = "sqlite:///./smartpark.db"  # Keep for backward compatibility
+    MONGODB_DB: str = "smartpark"
+    STORAGE_BACKEND: str = "mongo"  # "mongo" or "sqlite"
+    DATABASE_URL: str = "sqlite:///./smartpark.db"  # sqlite backend; sqlite:///:memory: for a throwaway store
     JWT_SECRET: str = os.getenv("JWT_SECRET", "smartpark-secret-key-2024-secure")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 0  # 0 = no timeout
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGO_COMPRESSORS: str = ""  # e.g. "zstd,snappy,zlib"
+    MONGO_READ_PREFERENCE: str = "primary"
+    MONGO_SLOW_COMMAND_MS: float = 100
+    # Without a limit, list endpoints return as many rows as before pagination (clients that
+    # never follow X-Next-Cursor, like the bundled frontend, see the same results)
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 100
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_SIZE: int = 2048
+    RESPONSE_CACHE_TTL_SECONDS: float = 300
+    LISTING_IMPORT_BATCH_SIZE: int = 500
+    LISTING_IMPORT_MAX_ROWS: int = 50000
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024  # 10 MB
+    UPLOAD_MAX_FILES: int = 10
+    IMAGE_WORKERS: int = 2
+    # /static: lifetime of content-addressed uploads in browser and CDN caches
+    STATIC_MAX_AGE_SECONDS: int = 365 * 24 * 3600
+    STATIC_STAT_CACHE_SIZE: int = 10000
+    STATIC_STAT_CACHE_SECONDS: float = 60
+    # e.g. "/internal/static/": answer with X-Accel-Redirect and let nginx send the file
+    STATIC_ACCEL_REDIRECT_PREFIX: str = ""
+    PASSWORD_HASH_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)
+    # Token buckets on /api/auth (and /auth): burst size and refill rate; burst 0 disables
+    AUTH_RATE_LIMIT_IP_BURST: int = 20
+    AUTH_RATE_LIMIT_IP_PER_MINUTE: float = 10
+    AUTH_RATE_LIMIT_EMAIL_BURST: int = 5
+    AUTH_RATE_LIMIT_EMAIL_PER_MINUTE: float = 2
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    AUTH_MAX_IN_FLIGHT: int = max(1, (os.cpu_count() or 2) // 2) * 4  # per worker; 0 disables
+    BOOKING_SWEEP_INTERVAL_SECONDS: float = 60  # 0 disables the sweeper
+    BOOKING_SWEEP_BATCH_SIZE: int = 500
+    BOOKING_SWEEP_MAX_BATCHES: int = 20  # per sweep, so one run cannot hog the worker
+    EVENTS_QUEUE_SIZE: int = 100  # per subscriber; a full queue evicts the subscriber
+    EVENTS_KEEPALIVE_SECONDS: float = 15
+    EVENTS_MAX_LISTING_IDS: int = 100
+    # Quotes: multipliers apply to hours in PRICING_PEAK_HOURS (hour ranges, end exclusive)
+    # and to Saturdays/Sundays, both in local time at PRICING_UTC_OFFSET_MINUTES
+    PRICING_PEAK_HOURS: str = "8-10,17-20"
+    PRICING_PEAK_MULTIPLIER: float = 1.0
+    PRICING_WEEKEND_MULTIPLIER: float = 1.0
+    PRICING_UTC_OFFSET_MINUTES: int = 0
+    QUOTE_MAX_LISTINGS: int = 5000
+    QUOTE_MAX_HOURS: int = 24 * 31
+    # Ids accepted by GET /api/profiles/batch
+    PROFILE_BATCH_MAX_IDS: int = 100
+    # Listing search with start/end: longest window, and listings examined per request
+    AVAILABILITY_MAX_HOURS: int = 24 * 31
+    AVAILABILITY_MAX_SCAN: int = 1000
+    # Longest booking POST /api/bookings/ accepts
+    BOOKING_MAX_HOURS: int = 24 * 31
 
 settings = Settings()
@@ -1,21 +1,116 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from .config import settings
+from .indexes import ensure_indexes
+from .metrics import MongoCommandMetrics, mongo_pool_stats
 
 # MongoDB client
 client = None
 database = None
+# Storage behind the routers (app.repositories), chosen by STORAGE_BACKEND
+repositories = None
+# Set once the pool is warm and indexes exist; drives /readyz
+ready = False
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        "event_listeners": [MongoCommandMetrics(), mongo_pool_stats],
+    }
+    if settings.MONGO_SOCKET_TIMEOUT_MS:
+        options["socketTimeoutMS"] = settings.MONGO_SOCKET_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
 
 async def connect_to_mongo():
-    global client, database
-    client = AsyncIOMotorClient(settings.MONGODB_URI)
-    database = client.smartpark
-    print("✅ Connected to MongoDB")
+    global client, database, repositories, ready
+    from app.repositories.mongo import MongoRepositories
+    client = AsyncIOMotorClient(settings.MONGODB_URI, **client_options())
+    database = client[settings.MONGODB_DB]
+    
+    # Pay for server selection and connection setup now rather than on the first
+    # requests: concurrent pings each check out (and so open) a pooled connection
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(max(1, settings.MONGO_MIN_POOL_SIZE))))
+    print(f"✅ Connected to MongoDB ({mongo_pool_stats.open} pooled connections)")
+    await ensure_indexes(database)
+    repositories = MongoRepositories(client, database)
+    # Listings stored before /nearby existed have coordinates but no GeoJSON location
+    locations = await repositories.listings.backfill_locations()
+    if locations:
+        print(f"📍 Added locations to {locations} listings")
+    # Listings booked before booking_calendars existed get their calendar now, so their
+    # existing bookings still block overlapping ones
+    bookings, calendars = await repositories.bookings.rebuild_calendars()
+    if calendars:
+        print(f"📅 Created {calendars} booking calendars from {bookings} active bookings")
+    ready = True
 
 async def close_mongo_connection():
-    global client
+    global client, ready
+    ready = False
     if client:
         client.close()
         print("❌ Closed MongoDB connection")
 
+async def connect_storage():
+    global repositories, ready
+    if settings.STORAGE_BACKEND == "mongo":
+        await connect_to_mongo()
+    elif settings.STORAGE_BACKEND == "sqlite":
+        from app.repositories.sqlite import open_sqlite_repositories
+        repositories = await open_sqlite_repositories(settings.DATABASE_URL)
+        print(f"✅ Opened SQLite storage ({settings.DATABASE_URL})")
+        ready = True
+    else:
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+async def close_storage():
+    global repositories, ready
+    if settings.STORAGE_BACKEND == "mongo":
+        await close_mongo_connection()
+    elif repositories is not None:
+        ready = False
+        await repositories.close()
+        print("❌ Closed SQLite storage")
+    repositories = None
+
+async def check_database(timeout: float = 1.0) -> dict:
+    """Ping the server and describe the pool, for the readiness probe."""
+    if settings.STORAGE_BACKEND != "mongo":
+        state = {"ready": ready, "backend": settings.STORAGE_BACKEND}
+        if repositories is None:
+            state["ping"] = "not connected"
+            return state
+        try:
+            await asyncio.wait_for(repositories.ping(), timeout)
+            state["ping"] = "ok"
+        except Exception as e:
+            state["ping"] = f"failed: {type(e).__name__}"
+        return state
+    state = {"ready": ready, "pool": mongo_pool_stats.snapshot()}
+    if client is None:
+        state["ping"] = "not connected"
+        return state
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout)
+        state["ping"] = "ok"
+    except Exception as e:
+        state["ping"] = f"failed: {type(e).__name__}"
+    state["servers"] = {
+        f"{host}:{port}": description.server_type_name
+        for (host, port), description in client.delegate.topology_description.server_descriptions().items()
+    }
+    return state
+
 def get_database():
     return database
+
+def get_repositories():
+    return repositories
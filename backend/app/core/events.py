@@ -0,0 +1,103 @@
+import asyncio
+import itertools
+import json
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Optional, Set, Union
+from .config import settings
+from .metrics import CallbackMetric, Counter, register
+
+# Queued after a slow consumer's backlog is dropped; tells the stream to close
+EVICTED = object()
+
+events_published = register(Counter("events_published_total", "Live update events by type", ("event",)))
+subscribers_evicted = register(Counter("events_subscribers_evicted_total", "Subscribers dropped for falling behind"))
+
+def fold_city(city: str) -> str:
+    # Cities match case-insensitively, as in listing browse
+    return city.strip().lower()
+
+class Subscription:
+    def __init__(self, cities: Set[str], listing_ids: Set[str], queue_size: int):
+        self.cities = cities
+        self.listing_ids = listing_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.evicted = False
+
+class EventBroker:
+    """In-process pub/sub for live listing updates.
+
+    Subscribers are indexed by city and listing id, so publishing only touches the
+    interested ones. Each has a bounded queue. A subscriber whose queue is full is
+    evicted rather than slowing the publisher or buffering without limit. Delivery
+    is per worker process: subscribers only see events published in their own worker.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._by_city: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._by_listing: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self._ids = itertools.count(1)
+
+    def subscribe(self, cities: Iterable[str] = (), listing_ids: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription({fold_city(city) for city in cities}, set(listing_ids), self.queue_size)
+        for city in subscription.cities:
+            self._by_city[city].add(subscription)
+        for listing_id in subscription.listing_ids:
+            self._by_listing[listing_id].add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for index, keys in ((self._by_city, subscription.cities), (self._by_listing, subscription.listing_ids)):
+            for key in keys:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del index[key]
+        if not subscription.evicted:
+            self._count -= 1
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def has_city_subscribers(self) -> bool:
+        return bool(self._by_city)
+
+    def publish(self, event: str, data: Union[dict, Callable[[], dict]], listing_id: str, cities: Iterable[Optional[str]] = ()):
+        """Queue ``event`` for subscribers of ``listing_id`` or any of ``cities``. ``data``
+        may be a callable, so the payload is only built when someone is listening."""
+        targets = set(self._by_listing.get(listing_id, ()))
+        for city in cities:
+            if city:
+                targets.update(self._by_city.get(fold_city(city), ()))
+        if not targets:
+            return
+        events_published.inc(event)
+        if callable(data):
+            data = data()
+        # Serialize once for every subscriber
+        message = f"id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(subscription)
+
+    def _evict(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        subscription.evicted = True
+        subscribers_evicted.inc()
+        # Drop the backlog so the eviction notice is the next thing the stream sees
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(EVICTED)
+
+broker = EventBroker(settings.EVENTS_QUEUE_SIZE)
+
+register(CallbackMetric(
+    "events_subscribers", "Open live update streams in this worker", "gauge", (),
+    lambda: {(): broker.subscriber_count},
+))
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from .config import settings
+
+UPLOAD_DIR = "static/uploads"
+UPLOAD_URL_PREFIX = "/static/uploads/"
+
+# variant name -> longest side in pixels
+VARIANTS = {"thumb": 320, "medium": 1024}
+VARIANT_FORMAT = "webp"
+VARIANT_QUALITY = 80
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def variant_file_name(file_name: str, variant: str) -> str:
+    stem = file_name.rsplit(".", 1)[0]
+    return f"{stem}.{variant}.{VARIANT_FORMAT}"
+
+def is_variant_file(file_name: str) -> bool:
+    return any(file_name.endswith(f".{variant}.{VARIANT_FORMAT}") for variant in VARIANTS)
+
+# Uploads are stored with the sniffed extension; older uploads kept the client's
+ORIGINAL_EXTENSIONS = ("jpg", "png", "gif", "webp", "jpeg", "JPG", "JPEG", "PNG")
+
+def original_file_names(file_name: str) -> List[str]:
+    """Names the original of variant ``file_name`` may have ([] if it is not a variant)."""
+    for variant in VARIANTS:
+        suffix = f".{variant}.{VARIANT_FORMAT}"
+        if file_name.endswith(suffix):
+            stem = file_name[:-len(suffix)]
+            return [f"{stem}.{ext}" for ext in ORIGINAL_EXTENSIONS]
+    return []
+
+def generate_derivatives(path: str, force: bool = False) -> List[str]:
+    """Write resized WebP variants next to ``path``. Runs in a worker process.
+
+    Each variant is written to a temporary name and renamed into place, so a variant
+    file that exists is always complete.
+    """
+    from PIL import Image
+
+    directory, file_name = os.path.split(path)
+    written = []
+    with Image.open(path) as original:
+        original.load()
+        image = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+        for variant, max_side in VARIANTS.items():
+            target = os.path.join(directory, variant_file_name(file_name, variant))
+            if not force and os.path.exists(target):
+                continue
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side))
+            tmp_path = os.path.join(directory, f".{uuid.uuid4()}.part")
+            resized.save(tmp_path, format=VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+            os.replace(tmp_path, target)
+            written.append(target)
+    return written
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+def _log_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"❌ Image derivative job failed: {future.exception()}")
+
+def schedule_derivatives(file_name: str):
+    """Queue derivative generation for an uploaded file without waiting for it."""
+    if all(os.path.exists(os.path.join(UPLOAD_DIR, variant_file_name(file_name, v))) for v in VARIANTS):
+        return
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_executor(), generate_derivatives, os.path.join(UPLOAD_DIR, file_name))
+    future.add_done_callback(_log_failure)
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def variant_urls(url: str) -> Dict[str, str]:
+    """URLs of the derivatives of an uploaded image (the original's for external images).
+
+    Derived from the name alone, so building a response never touches the filesystem;
+    until a variant has been written the upload mount answers its URL with the original.
+    """
+    urls = {"original": url}
+    file_name = url[len(UPLOAD_URL_PREFIX):] if url.startswith(UPLOAD_URL_PREFIX) else None
+    for variant in VARIANTS:
+        urls[variant] = UPLOAD_URL_PREFIX + variant_file_name(file_name, variant) if file_name else url
+    return urls
@@ -0,0 +1,33 @@
+from collections import defaultdict
+from typing import Dict, List
+from pymongo import IndexModel
+from pymongo.collation import Collation
+from pymongo.errors import OperationFailure
+
+# Case-insensitive comparisons (e.g. "mumbai" == "Mumbai"); queries must pass the
+# same collation to be answered by an index declared with it
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
+# IndexOptionsConflict / IndexKeySpecsConflict
+_CONFLICT_CODES = {85, 86}
+
+# collection name -> indexes, filled in by router modules at import time
+INDEXES: Dict[str, List[IndexModel]] = defaultdict(list)
+
+def register_indexes(collection: str, *indexes: IndexModel):
+    INDEXES[collection].extend(indexes)
+
+async def ensure_indexes(db):
+    """Create every registered index. Safe to run on each startup: existing identical
+    indexes are a no-op, while an index that exists with different options aborts startup."""
+    for collection, indexes in INDEXES.items():
+        try:
+            names = await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            if e.code in _CONFLICT_CODES:
+                print(f"❌ Index conflict on '{collection}': {e}")
+                raise RuntimeError(
+                    f"Existing index on '{collection}' conflicts with the declared one; drop it and restart"
+                ) from e
+            raise
+        print(f"📊 Indexes ready on '{collection}': {', '.join(names)}")
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set
+from fastapi import HTTPException
+from app.core.database import get_repositories
+from app.repositories.base import UserRepository
+from app.schemas.auth import ProfileSummary
+
+def profile_summary(user: dict) -> ProfileSummary:
+    return ProfileSummary(user_id=user["_id"], email=user["email"], role=user["role"])
+
+class ProfileLoader:
+    """Request-scoped batcher for profile summaries, DataLoader style.
+
+    ``load`` calls made in the same event loop turn are coalesced into a single
+    ``users.get_many`` query, and each id is fetched at most once per loader, so
+    embedding owners or renters in a page of N rows costs one query instead of N.
+    """
+
+    def __init__(self, users: UserRepository):
+        self.users = users
+        self._results: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, user_id: str) -> "asyncio.Future[Optional[ProfileSummary]]":
+        future = self._results.get(user_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[user_id] = loop.create_future()
+            if not self._pending:
+                # Let the caller queue the rest of its ids before querying
+                loop.call_soon(self._schedule_dispatch)
+            self._pending.append(user_id)
+        return future
+
+    async def load_many(self, user_ids: Iterable[Optional[str]]) -> List[Optional[ProfileSummary]]:
+        """Summaries parallel to ``user_ids``; None for missing users (and None ids)."""
+        user_ids = list(user_ids)
+        futures = {user_id: self.load(user_id) for user_id in user_ids if user_id}
+        if futures:
+            await asyncio.gather(*futures.values())
+        return [futures[user_id].result() if user_id else None for user_id in user_ids]
+
+    def _schedule_dispatch(self):
+        task = asyncio.ensure_future(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        user_ids, self._pending = self._pending, []
+        try:
+            users = await self.users.get_many(user_ids)
+        except Exception as e:
+            for user_id in user_ids:
+                # Forget the failure so a later load retries
+                self._results.pop(user_id).set_exception(e)
+            return
+        for user_id in user_ids:
+            user = users.get(user_id)
+            self._results[user_id].set_result(profile_summary(user) if user else None)
+
+def get_profile_loader() -> ProfileLoader:
+    # FastAPI resolves a dependency once per request, which scopes the loader to it
+    return ProfileLoader(get_repositories().users)
+
+def parse_expand(expand: Optional[str], allowed: Iterable[str]) -> Set[str]:
+    """``expand=owner,renter`` -> {"owner", "renter"}; 400 on anything not in ``allowed``."""
+    fields = {field.strip() for field in (expand or "").split(",") if field.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot expand {', '.join(sorted(unknown))}")
+    return fields
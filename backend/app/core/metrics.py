@@ -0,0 +1,236 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+from pymongo import monitoring
+from .config import settings
+
+# Latency buckets in seconds (Prometheus "le" upper bounds)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """Counter or gauge whose samples are read from a callback at scrape time, for
+    values other modules already track (e.g. cache hit counts)."""
+
+    def __init__(self, name: str, help: str, type: str, labels: Sequence[str], collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name, self.help, self.type, self.labels, self.collect = name, help, type, tuple(labels), collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+REGISTRY: list = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+http_request_duration = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+http_requests = register(Counter(
+    "http_requests_total", "HTTP responses by route and status", ("method", "route", "status")
+))
+mongo_command_duration = register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("collection", "command")
+))
+mongo_command_failures = register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands", ("collection", "command")
+))
+mongo_slow_commands = register(Counter(
+    "mongodb_slow_commands_total", "MongoDB commands slower than MONGO_SLOW_COMMAND_MS", ("collection", "command")
+))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency and status counts.
+
+    Routes are labelled by their path template (``/api/listings/{id}``), which FastAPI
+    stores in ``scope["route"]`` once the router has matched, keeping label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is None:
+                path = "/static" if scope["path"].startswith("/static/") else "unmatched"
+            http_request_duration.observe(time.perf_counter() - start, scope["method"], path)
+            http_requests.inc(scope["method"], path, str(status_code))
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener timing every command per collection and operation.
+    Called from the driver's threads, hence the locking in the metric types."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return (event.connection_id, event.request_id, event.operation_id)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        # getMore names its collection separately; its command value is the cursor id
+        collection = target if isinstance(target, str) else event.command.get("collection", "-")
+        with self._lock:
+            self._pending[self._key(event)] = collection
+
+    def _finish(self, event) -> str:
+        with self._lock:
+            return self._pending.pop(self._key(event), "-")
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        mongo_command_duration.observe(seconds, collection, event.command_name)
+        if seconds * 1000 >= settings.MONGO_SLOW_COMMAND_MS:
+            mongo_slow_commands.inc(collection, event.command_name)
+            print(f"🐢 Slow MongoDB {event.command_name} on '{collection}': {seconds * 1000:.1f} ms")
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_command_failures.inc(collection, event.command_name)
+
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out driver connections for /metrics and /readyz."""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.check_out_failures = 0
+        self._lock = threading.Lock()
+
+    def _add(self, field: str, amount: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_checked_out(self, event):
+        self._add("checked_out", 1)
+
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+
+    def connection_check_out_failed(self, event):
+        self._add("check_out_failures", 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        return {"open": self.open, "checked_out": self.checked_out, "check_out_failures": self.check_out_failures}
+
+mongo_pool_stats = MongoPoolStats()
+register(CallbackMetric(
+    "mongodb_pool_connections", "Driver connections by state", "gauge", ("state",),
+    lambda: {("open",): mongo_pool_stats.open, ("checked_out",): mongo_pool_stats.checked_out},
+))
+register(CallbackMetric(
+    "mongodb_pool_check_out_failures_total", "Failed connection check-outs", "counter", (),
+    lambda: {(): mongo_pool_stats.check_out_failures},
+))
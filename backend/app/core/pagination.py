@@ -0,0 +1,84 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import json_util
+from fastapi import HTTPException
+from .config import settings
+
+# Default keyset order: newest first, _id breaks ties between equal timestamps
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return settings.PAGE_SIZE_DEFAULT
+    return max(1, min(limit, settings.PAGE_SIZE_MAX))
+
+def _sort_signature(sort) -> str:
+    return ",".join(f"{field}:{direction}" for field, direction in sort)
+
+def _encode_value(value):
+    # json_util keeps only milliseconds, but SQLite rows carry microseconds and a
+    # truncated cursor would skip rows from the same millisecond
+    return {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+
+def _decode_value(value):
+    return datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) and "$dt" in value else value
+
+def encode_cursor(sort, doc: dict) -> str:
+    payload = json_util.dumps({"s": _sort_signature(sort), "v": [_encode_value(doc.get(field)) for field, _ in sort]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(sort, cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = [_decode_value(value) for value in payload["v"]]
+        signature = payload["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if signature != _sort_signature(sort) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Cursor does not match this query")
+    return values
+
+def keyset_filter(sort, values: list) -> dict:
+    """Match documents strictly after ``values`` in ``sort`` order.
+
+    For sort keys (a, b, c) this is ``a > va OR (a = va AND b > vb) OR ...`` with the
+    comparison flipped for descending keys, which an index on the sort keys answers
+    with a range scan instead of skipping over earlier pages.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+def page_query(query: dict, sort, cursor: Optional[str]) -> dict:
+    """``query`` narrowed to the rows after ``cursor`` (the first page when it is None)."""
+    if not cursor:
+        return query
+    return {"$and": [query, keyset_filter(sort, decode_cursor(sort, cursor))]}
+
+async def fetch_page(
+    collection,
+    query: dict,
+    limit: Optional[int],
+    cursor: Optional[str],
+    sort=NEWEST_FIRST,
+    collation=None,
+    projection=None,
+) -> Tuple[List[dict], Optional[str]]:
+    limit = clamp_limit(limit)
+    query = page_query(query, sort, cursor)
+
+    # Fetch one extra row to learn whether another page exists
+    docs = await collection.find(query, projection, collation=collation).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(sort, docs[-1])
+    return docs, next_cursor
@@ -0,0 +1,54 @@
+import calendar
+from datetime import datetime
+from typing import Tuple
+import numpy as np
+from .analytics import utc_naive
+from .config import settings
+
+def parse_hours(spec: str) -> np.ndarray:
+    """"7-10,17-20" -> the hours of day 7, 8, 9, 17, 18, 19 (end exclusive)."""
+    hours = set()
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        first, _, last = part.partition("-")
+        hours.update(range(int(first), int(last)) if last else [int(first)])
+    return np.array(sorted(hours), dtype=np.int64)
+
+PEAK_HOURS = parse_hours(settings.PRICING_PEAK_HOURS)
+
+def window_hours(start: datetime, end: datetime) -> Tuple[float, float, float, float]:
+    """Hours of [start, end) that are (plain, peak only, weekend only, peak and weekend),
+    with peak hours and weekends in local time (PRICING_UTC_OFFSET_MINUTES)."""
+    offset = settings.PRICING_UTC_OFFSET_MINUTES * 60
+    t0 = calendar.timegm(utc_naive(start).timetuple()) + utc_naive(start).microsecond / 1e6 + offset
+    t1 = calendar.timegm(utc_naive(end).timetuple()) + utc_naive(end).microsecond / 1e6 + offset
+    if t1 <= t0:
+        return 0.0, 0.0, 0.0, 0.0
+    # One segment per clock hour the window touches, clipped to the window
+    edges = np.arange(np.floor(t0 / 3600) * 3600, t1 + 3600, 3600)
+    starts = np.clip(edges[:-1], t0, t1)
+    durations = (np.clip(edges[1:], t0, t1) - starts) / 3600
+    hour_starts = edges[:-1].astype(np.int64)
+    peak = np.isin((hour_starts // 3600) % 24, PEAK_HOURS)
+    # Epoch day 0 was a Thursday; Monday = 0 .. Sunday = 6
+    weekend = ((hour_starts // 86400) + 3) % 7 >= 5
+    return (
+        float(durations[~peak & ~weekend].sum()),
+        float(durations[peak & ~weekend].sum()),
+        float(durations[~peak & weekend].sum()),
+        float(durations[peak & weekend].sum()),
+    )
+
+def quote_amounts(prices: np.ndarray, start: datetime, end: datetime, peak_multiplier=None, weekend_multiplier=None) -> np.ndarray:
+    """Amounts for renting each listing over [start, end), one vectorized pass over ``prices``.
+
+    The multipliers default to the PRICING_* settings. They may also be arrays parallel to
+    ``prices`` (per-listing pricing) and broadcast the same way.
+    """
+    peak_multiplier = settings.PRICING_PEAK_MULTIPLIER if peak_multiplier is None else peak_multiplier
+    weekend_multiplier = settings.PRICING_WEEKEND_MULTIPLIER if weekend_multiplier is None else weekend_multiplier
+    plain, peak, weekend, both = window_hours(start, end)
+    effective_hours = plain + peak_multiplier * peak + weekend_multiplier * weekend + peak_multiplier * weekend_multiplier * both
+    return np.round(np.asarray(prices, dtype=np.float64) * effective_hours, 2)
+
+def quote_amount(price_per_hour: float, start: datetime, end: datetime) -> float:
+    return float(quote_amounts(np.array([price_per_hour]), start, end)[0])
@@ -0,0 +1,90 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Request
+from .config import settings
+from .metrics import Counter, CallbackMetric, register
+
+rate_limited = register(Counter("rate_limited_total", "Requests rejected by rate limits or admission control", ("scope",)))
+
+class RateLimiter:
+    """Token bucket per key (client IP, email): up to ``burst`` requests at once, refilled
+    at ``per_minute``. ``burst`` <= 0 disables the limit.
+
+    Buckets are kept in LRU order and the least recently used ones are dropped beyond
+    ``max_keys``, so a flood of distinct keys cannot grow memory without bound. Only
+    touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, burst: int, per_minute: float, max_keys: int):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+
+    def hit(self, key: str) -> float:
+        """Take a token for ``key``. Returns 0 if allowed, else seconds until one is available."""
+        if self.burst <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate if self.rate > 0 else 60.0
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+class AdmissionGate:
+    """Caps concurrent executions of a block, rejecting the excess with ``503`` instead
+    of queueing it. ``limit`` <= 0 disables the cap."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+
+    async def __aenter__(self):
+        if 0 < self.limit <= self.in_flight:
+            rate_limited.inc(self.name)
+            raise HTTPException(status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"})
+        self.in_flight += 1
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+
+ip_limiter = RateLimiter(settings.AUTH_RATE_LIMIT_IP_BURST, settings.AUTH_RATE_LIMIT_IP_PER_MINUTE, settings.RATE_LIMIT_MAX_KEYS)
+email_limiter = RateLimiter(settings.AUTH_RATE_LIMIT_EMAIL_BURST, settings.AUTH_RATE_LIMIT_EMAIL_PER_MINUTE, settings.RATE_LIMIT_MAX_KEYS)
+# Password hashing is the CPU-heavy part of auth; beyond this many requests in flight
+# per worker the executor queue would only grow, so shed load instead
+auth_admission = AdmissionGate("auth_in_flight", settings.AUTH_MAX_IN_FLIGHT)
+
+register(CallbackMetric(
+    "auth_in_flight", "Auth requests currently hashing or verifying passwords", "gauge", (),
+    lambda: {(): auth_admission.in_flight},
+))
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+def _reject(scope: str, wait: float):
+    rate_limited.inc(scope)
+    raise HTTPException(
+        status_code=429, detail="Too many attempts, slow down", headers={"Retry-After": str(math.ceil(wait))}
+    )
+
+def check_auth_rate_limits(request: Request, email: Optional[str]):
+    """Per client IP, then per email (so one account cannot be brute-forced from many IPs)."""
+    wait = ip_limiter.hit(client_ip(request))
+    if wait:
+        _reject("ip", wait)
+    if email:
+        wait = email_limiter.hit(email.strip().lower())
+        if wait:
+            _reject("email", wait)
@@ -0,0 +1,64 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from fastapi import Request, Response
+from .cache import CacheBackend, create_cache_backend
+from .config import settings
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def to_response(self, request: Request) -> Response:
+        headers = {**self.headers, "ETag": self.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class ResponseCache:
+    """Read-through cache of serialized JSON responses.
+
+    Keys embed the current generation of every scope the response depends on
+    (e.g. ``all``, ``city:mumbai``, ``listing:<id>``). Writers bump those generations,
+    which makes old keys unreachable without having to enumerate them. The generation
+    is read before the database query, so a response computed while a write lands is
+    stored under the stale generation and never served.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    async def versioned_key(self, key: str, *scopes: str) -> str:
+        generations = [str(await self.backend.get_counter(f"gen:{scope}")) for scope in scopes]
+        return f"{key}@{'.'.join(generations)}"
+
+    async def get(self, versioned_key: str) -> Optional[CachedResponse]:
+        return await self.backend.get(versioned_key)
+
+    async def set(self, versioned_key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=make_etag(body), headers=headers or {})
+        await self.backend.set(versioned_key, entry)
+        return entry
+
+    async def invalidate(self, *scopes: str):
+        for scope in scopes:
+            await self.backend.incr(f"gen:{scope}")
+
+response_cache = ResponseCache(
+    create_cache_backend(
+        settings.RESPONSE_CACHE_BACKEND,
+        maxsize=settings.RESPONSE_CACHE_SIZE,
+        ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    )
+)
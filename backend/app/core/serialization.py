@@ -0,0 +1,31 @@
+from typing import Dict, Iterable, List, Optional, Type
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def projection_for(model: Type[BaseModel], *extra: str) -> Dict[str, int]:
+    """Mongo projection selecting only the fields ``model`` serializes (``id`` maps to ``_id``)."""
+    fields = {name: 1 for name in model.model_fields if name != "id"}
+    fields.update({name: 1 for name in extra})
+    return fields
+
+def from_documents(model: Type[BaseModel], docs: Iterable[dict]) -> List[BaseModel]:
+    # Documents come from our own collections and were validated on write, so skip
+    # re-validation and build the models directly (the _id key is consumed)
+    construct = model.model_construct
+    return [construct(id=doc.pop("_id"), **doc) for doc in docs]
+
+def json_response(adapter: TypeAdapter, value, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize with pydantic-core's JSON encoder, bypassing FastAPI's second
+    ``response_model`` validation pass."""
+    return Response(content=adapter.dump_json(value), media_type="application/json", headers=headers)
+
+def ndjson_response(model: Type[BaseModel], cursor) -> StreamingResponse:
+    """Stream documents from an async iterator (e.g. a Motor cursor) as one JSON document per line."""
+    async def lines():
+        construct = model.model_construct
+        async for doc in cursor:
+            yield construct(id=doc.pop("_id"), **doc).model_dump_json().encode() + b"\n"
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
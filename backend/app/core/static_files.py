@@ -0,0 +1,171 @@
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate
+from typing import Optional
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+from .cache import TTLCache
+from .config import settings
+from .images import original_file_names
+
+# Uploads (and their variants) are named after the SHA-256 of their content, so a URL
+# always names the same bytes: the name is a strong ETag and the file can be cached forever
+CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64}(?:\.[a-z]+)?)\.[a-z0-9]+$")
+IMMUTABLE = f"public, max-age={settings.STATIC_MAX_AGE_SECONDS}, immutable"
+REVALIDATE = "public, no-cache"
+
+def _read(path: str, offset: int, size: int) -> bytes:
+    # Open, read and close in one worker thread hop
+    with open(path, "rb", buffering=0) as file:
+        return os.pread(file.fileno(), size, offset)
+
+class UploadFileResponse(FileResponse):
+    """FileResponse that hands the file to the server when it supports the ASGI
+    ``http.response.zerocopysend`` (sendfile) or ``http.response.pathsend`` extensions,
+    and otherwise reads each chunk with a single thread hop.
+
+    Overrides FileResponse's body senders, so it tracks the pinned Starlette version.
+    """
+
+    chunk_size = 256 * 1024
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.extensions = scope.get("extensions") or {}
+        await super().__call__(scope, receive, send)
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        # Starlette checks If-Range against its own mtime-size tag; compare with the ETag
+        # actually sent (the content hash for uploads). If-Range needs a strong match.
+        etag = self.headers.get("etag")
+        if etag and not etag.startswith("W/") and http_if_range == etag:
+            return True
+        return http_if_range == formatdate(stat_result.st_mtime, usegmt=True)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.pathsend" in self.extensions:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            await self._send_body(send, 0, self.stat_result.st_size)
+
+    async def _handle_single_range(self, send: Send, start: int, end: int, file_size: int, send_header_only: bool) -> None:
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await self._send_body(send, start, end)
+
+    async def _send_body(self, send: Send, start: int, end: int) -> None:
+        if "http.response.zerocopysend" in self.extensions:
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": start, "count": end - start})
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+            return
+        while True:
+            chunk = await anyio.to_thread.run_sync(_read, self.path, start, min(self.chunk_size, end - start))
+            start += len(chunk)
+            more_body = bool(chunk) and start < end
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            if not more_body:
+                return
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles for the upload directory.
+
+    Content-addressed files get ``Cache-Control: immutable`` and their name as a strong
+    ETag, and stat results are cached briefly (uploads are never rewritten in place), so
+    a warm request costs no filesystem calls before the body is read. Ranges and
+    conditional requests are answered here. A variant that is not written yet is answered
+    with its original, uncached. With STATIC_ACCEL_REDIRECT_PREFIX set, the body is left
+    to the front proxy via ``X-Accel-Redirect``.
+    """
+
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.stat_cache = TTLCache(maxsize=settings.STATIC_STAT_CACHE_SIZE, ttl=settings.STATIC_STAT_CACHE_SECONDS)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        cached = self.stat_cache.get(path)
+        if cached is None:
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            except OSError:
+                # Name too long, permissions and so on: the plain implementation sorts these out
+                return await super().get_response(path, scope)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                original = await anyio.to_thread.run_sync(self.lookup_original, path)
+                if original is not None:
+                    return self.file_response(*original, scope, immutable=False)
+                return await super().get_response(path, scope)
+            cached = (full_path, stat_result)
+            self.stat_cache.set(path, cached)
+        full_path, stat_result = cached
+        return self.file_response(full_path, stat_result, scope)
+
+    def lookup_original(self, path: str):
+        """(full_path, stat_result) of the original behind a variant that is not written
+        yet, or None. Variant URLs are handed out before their files exist."""
+        head, file_name = os.path.split(path)
+        for name in original_file_names(file_name):
+            try:
+                full_path, stat_result = self.lookup_path(os.path.join(head, name))
+            except OSError:
+                return None
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return full_path, stat_result
+        return None
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200,
+                      immutable: bool = True) -> Response:
+        file_name = os.path.basename(full_path)
+        # A stand-in original must be revalidated, so clients pick up the variant once it exists
+        match = CONTENT_ADDRESSED.match(file_name) if immutable else None
+        headers = {"cache-control": IMMUTABLE if match else REVALIDATE}
+        if match:
+            headers["etag"] = f'"{match.group(1)}"'
+        response = UploadFileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        prefix = settings.STATIC_ACCEL_REDIRECT_PREFIX
+        if prefix:
+            return self.offload_response(response, prefix + os.path.relpath(full_path, self.directory).replace(os.sep, "/"))
+        return response
+
+    @staticmethod
+    def offload_response(response: FileResponse, location: str) -> Response:
+        # The proxy serves the bytes (including ranges) from its internal location and
+        # keeps our Content-Type and Cache-Control
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name in ("content-type", "cache-control", "etag", "last-modified")
+        }
+        headers["x-accel-redirect"] = location
+        return Response(status_code=response.status_code, headers=headers)
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # RFC 9110: If-None-Match (weak comparison) takes precedence, and If-Modified-Since
+        # is only consulted when it is absent
+        if_none_match: Optional[str] = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            etag = response_headers.get("etag", "").removeprefix("W/")
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = request_headers.get("if-modified-since")
+        last_modified = response_headers.get("last-modified")
+        if if_modified_since and last_modified:
+            since, modified = parsedate(if_modified_since), parsedate(last_modified)
+            return since is not None and modified is not None and since >= modified
+        return False
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Optional
+from .analytics import record_booking_events
+from .availability import occupancy_cutoff
+from .config import settings
+from .database import get_repositories
+from .metrics import Counter, Histogram, register
+
+LEASE_NAME = "booking_sweeper"
+# Identifies this worker process as the lease holder
+HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+
+sweep_batch_size = register(Histogram(
+    "booking_sweep_batch_size", "Bookings completed per sweep batch",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+))
+sweep_lag = register(Histogram(
+    "booking_sweep_lag_seconds", "Time between the oldest completed booking's end_time and its sweep",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600, 21600, 86400),
+))
+sweep_duration = register(Histogram("booking_sweep_duration_seconds", "Duration of sweeps that held the lease"))
+sweep_runs = register(Counter("booking_sweep_runs_total", "Sweeper ticks by outcome", ("result",)))
+bookings_completed = register(Counter("booking_sweep_completed_total", "Bookings moved to completed"))
+
+async def sweep_once(repos, now: Optional[datetime] = None) -> int:
+    """Complete active bookings whose end_time has passed, in batches; returns how many."""
+    now = now or datetime.utcnow()
+    total = 0
+    for _ in range(settings.BOOKING_SWEEP_MAX_BATCHES):
+        batch = await repos.bookings.complete_expired(now, settings.BOOKING_SWEEP_BATCH_SIZE)
+        if not batch:
+            break
+        if total == 0:
+            # Batches are oldest first, so the first one carries the sweep's lag
+            sweep_lag.observe((now - min(doc["end_time"] for doc in batch)).total_seconds())
+        await record_booking_events(repos, batch, "completed")
+        sweep_batch_size.observe(len(batch))
+        bookings_completed.inc(amount=len(batch))
+        total += len(batch)
+        if len(batch) < settings.BOOKING_SWEEP_BATCH_SIZE:
+            break
+    # Availability bitmaps of past days can no longer match a search window
+    await repos.bookings.prune_occupancy(occupancy_cutoff(now))
+    return total
+
+async def run_sweeper():
+    interval = settings.BOOKING_SWEEP_INTERVAL_SECONDS
+    while True:
+        try:
+            repos = get_repositories()
+            # Every worker runs this loop; the lease (held a little over one interval and
+            # renewed each tick) lets only one of them sweep at a time
+            if repos is None or not await repos.acquire_lease(LEASE_NAME, HOLDER, interval * 1.5):
+                sweep_runs.inc("skipped")
+            else:
+                start = time.perf_counter()
+                completed = await sweep_once(repos)
+                sweep_duration.observe(time.perf_counter() - start)
+                sweep_runs.inc("ok")
+                if completed:
+                    print(f"🧹 Completed {completed} expired bookings")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            sweep_runs.inc("error")
+            print(f"⚠️ Booking sweep failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(interval)
+
+def start_sweeper() -> Optional[asyncio.Task]:
+    if settings.BOOKING_SWEEP_INTERVAL_SECONDS <= 0:
+        return None
+    return asyncio.create_task(run_sweeper())
+
+async def stop_sweeper(task: Optional[asyncio.Task]):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -1,10 +1,14 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
 from jose import jwt, JWTError
 from app.core.config import settings
-from app.core.database import get_database
+from app.core.database import get_repositories
+from app.core.cache import user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# For public routes with extras that need a signed-in user; yields None without a token
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -20,13 +24,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    db = get_database()
-    user = await db.users.find_one({"_id": user_id})
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        user = await get_repositories().users.get(user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user)
     
     return user
 
+async def require_user(token: Optional[str]) -> dict:
+    """Resolve a token from optional_oauth2_scheme, answering 401 like get_current_user."""
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(token)
+
 async def get_current_provider(current_user: dict = Depends(get_current_user)):
     if current_user.get("role") != "provider":
         raise HTTPException(status_code=403, detail="Not authorized as provider")
@@ -1,20 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.routers import auth, listings, bookings, upload, users, profiles
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.routers import auth, listings, bookings, upload, users, profiles, analytics
+from app.core.analytics import backfill_rollups
+from app.core.database import connect_storage, close_storage, check_database, get_repositories
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.cache import user_cache
+from app.core.images import shutdown_image_workers
+from app.core.sweeper import start_sweeper, stop_sweeper, HOLDER
+from app.core.static_files import UploadStaticFiles
+from app.core.metrics import MetricsMiddleware, CallbackMetric, register, render_metrics
 import os
 
-app = FastAPI(title="SmartPark API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open storage (and warm the MongoDB pool) before the worker accepts traffic
+    await connect_storage()
+    rebuilt = await backfill_rollups(get_repositories(), HOLDER)
+    if rebuilt:
+        print(f"📊 Built {rebuilt[1]} listing-day rollups from {rebuilt[0]} existing bookings")
+    sweeper = start_sweeper()
+    yield
+    await stop_sweeper(sweeper)
+    await close_storage()
+    shutdown_image_workers()
 
-# Startup and shutdown events
-@app.on_event("startup")
-async def startup_db_client():
-    await connect_to_mongo()
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_mongo_connection()
+app = FastAPI(title="SmartPark API", lifespan=lifespan)
 
 # CORS
 origins = [
@@ -29,11 +41,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+# Added last so it wraps everything else and times the whole request
+app.add_middleware(MetricsMiddleware)
+
+register(CallbackMetric(
+    "user_cache_requests_total", "Authenticated user cache lookups", "counter", ("result",),
+    lambda: {("hit",): user_cache.hits, ("miss",): user_cache.misses},
+))
+register(CallbackMetric(
+    "user_cache_entries", "Authenticated user cache size", "gauge", (),
+    lambda: {(): user_cache.stats()["size"]},
+))
 
-# Mount static files
+# Mount static files (immutable caching, ranges, optional proxy offload)
 os.makedirs("static/uploads", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", UploadStaticFiles(directory="static"), name="static")
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
@@ -43,7 +67,24 @@ app.include_router(bookings.router, prefix="/api/bookings", tags=["Bookings"])
 app.include_router(upload.router, prefix="/api/upload", tags=["Upload"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiles"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to SmartPark API - MongoDB Edition"}
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    # Liveness: the process is up and serving
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    # Readiness: pool warmed, indexes ensured and the database answering pings
+    state = await check_database()
+    ok = state["ready"] and state["ping"] == "ok"
+    return JSONResponse({"status": "ready" if ok else "unavailable", "database": state}, status_code=200 if ok else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
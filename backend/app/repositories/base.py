@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from app.core.pagination import NEWEST_FIRST
+
+# Listing browse orders: sort parameter -> keyset order (the trailing _id makes it total).
+# Field names are the document ones on every backend so cursors stay interchangeable.
+LISTING_SORTS = {
+    "newest": NEWEST_FIRST,
+    "price": [("price_per_hour", 1), ("_id", 1)],
+    "-price": [("price_per_hour", -1), ("_id", -1)],
+}
+
+class DuplicateError(Exception):
+    """A unique constraint (e.g. users.email) rejected the write."""
+
+@dataclass
+class ListingFilters:
+    # city and vehicle_size match case-insensitively
+    city: Optional[str] = None
+    vehicle_size: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+Page = Tuple[List[dict], Optional[str]]
+
+class UserRepository:
+    async def get(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, dict]:
+        """Users by id in one round trip, without password hashes; unknown ids are left out."""
+        raise NotImplementedError
+
+    async def create(self, user: dict):
+        """Insert a user document; raises DuplicateError if the email is taken."""
+        raise NotImplementedError
+
+    async def update(self, user_id: str, fields: dict):
+        """Set ``fields`` on the user; raises DuplicateError if the email is taken."""
+        raise NotImplementedError
+
+class ListingRepository:
+    """Listing documents are returned as dicts keyed like the Mongo documents
+    (``_id``, ``owner_id``, ...). List methods return only the ListingResponse fields."""
+
+    async def get(self, listing_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def create(self, listing: dict):
+        raise NotImplementedError
+
+    async def prices(self, listing_ids: List[str]) -> Dict[str, float]:
+        """``price_per_hour`` by listing id, in one round trip; unknown ids are left out."""
+        raise NotImplementedError
+
+    async def create_many(self, listings: List[dict]) -> Dict[int, str]:
+        """Insert without stopping at the first failure; returns {position: error} for rows that failed."""
+        raise NotImplementedError
+
+    async def update(self, listing: dict, fields: dict) -> dict:
+        """Apply ``fields`` to the stored ``listing`` and return the updated document."""
+        raise NotImplementedError
+
+    async def delete(self, listing_id: str):
+        raise NotImplementedError
+
+    async def browse(self, filters: ListingFilters, sort: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        raise NotImplementedError
+
+    async def search(self, q: str, filters: ListingFilters, limit: int) -> List[dict]:
+        """Top ``limit`` listings matching free text ``q`` (any term), best match first."""
+        raise NotImplementedError
+
+    async def nearby(self, lat: float, lng: float, radius_m: float, limit: int, vehicle_size: Optional[str]) -> List[dict]:
+        """Listings within ``radius_m`` metres, closest first, each with ``distance_m``."""
+        raise NotImplementedError
+
+    async def list_by_owner(self, owner_id: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        raise NotImplementedError
+
+    def stream(self, filters: ListingFilters) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+    def stream_by_owner(self, owner_id: str) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+class BookingRepository:
+    async def get(self, booking_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def create(self, booking: dict) -> bool:
+        """Insert an active booking unless it overlaps another active booking of the
+        same listing; returns False on overlap. Must be atomic under concurrency."""
+        raise NotImplementedError
+
+    async def cancel(self, booking: dict) -> bool:
+        """Cancel the booking if it is still active; returns False otherwise."""
+        raise NotImplementedError
+
+    async def complete_expired(self, now: datetime, limit: int) -> List[dict]:
+        """Mark up to ``limit`` active bookings that ended by ``now`` as completed, oldest
+        ``end_time`` first, and return them (without ``status``/``created_at``)."""
+        raise NotImplementedError
+
+    def stream_all(self) -> AsyncIterator[dict]:
+        """Every booking, in no particular order (for rebuilding rollups)."""
+        raise NotImplementedError
+
+    # create and cancel also keep per listing per day slot bitmaps of active bookings
+    # (see app.core.availability) for availability search
+
+    async def busy_listings(self, listing_ids: List[str], masks: Dict[str, int]) -> Set[str]:
+        """Those of ``listing_ids`` whose bitmap shares a slot with ``masks`` (day -> bitmask)."""
+        raise NotImplementedError
+
+    async def prune_occupancy(self, before_day: str):
+        """Drop the bitmaps of days before ``before_day``."""
+        raise NotImplementedError
+
+    async def replace_occupancy(self, bitmaps: Dict[Tuple[str, str], int]):
+        """Make ``bitmaps`` ({(listing_id, day): bitmask}) the complete set of bitmaps."""
+        raise NotImplementedError
+
+    async def list_by_renter(self, renter_id: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        raise NotImplementedError
+
+# Counters kept per listing per day
+ROLLUP_FIELDS = ("bookings", "cancelled", "completed", "hours", "revenue")
+
+class AnalyticsRepository:
+    """Per listing per UTC day rollups: ``listing_id``, ``owner_id``, ``day`` (YYYY-MM-DD)
+    and the counters in ROLLUP_FIELDS."""
+
+    async def apply(self, rows: List[dict]):
+        """Add each row's counters to its (listing_id, day) rollup, creating it if needed."""
+        raise NotImplementedError
+
+    async def replace_all(self, rows: List[dict]):
+        """Make ``rows`` the complete set of rollups (absolute values)."""
+        raise NotImplementedError
+
+    async def list_by_owner(self, owner_id: str, first_day: str, last_day: str) -> List[dict]:
+        """The owner's rollups with first_day <= day <= last_day, by listing then day."""
+        raise NotImplementedError
+
+    async def exists(self) -> bool:
+        """Whether any rollup has been written."""
+        raise NotImplementedError
+
+@dataclass
+class Repositories:
+    users: UserRepository
+    listings: ListingRepository
+    bookings: BookingRepository
+    analytics: AnalyticsRepository
+
+    async def ping(self):
+        """Raise if the backing store is unreachable."""
+        raise NotImplementedError
+
+    async def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        """Take or renew the named lease for ``seconds`` unless another holder has an
+        unexpired one, so periodic jobs run on one worker at a time."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
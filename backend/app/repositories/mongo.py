@@ -0,0 +1,518 @@
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from bson.int64 import Int64
+from pymongo import IndexModel, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.core.availability import from_hour_words, hour_words, neighbour_window, shared_slots, slot_masks, HOUR_WORD
+from app.core.indexes import register_indexes, CASE_INSENSITIVE
+from app.core.pagination import fetch_page, NEWEST_FIRST
+from app.core.serialization import projection_for
+from app.schemas.booking import BookingResponse
+from app.schemas.listing import ListingResponse, ListingNearbyResponse
+from .base import (
+    AnalyticsRepository, BookingRepository, DuplicateError, ListingFilters, ListingRepository, LISTING_SORTS,
+    Page, Repositories, ROLLUP_FIELDS, UserRepository,
+)
+
+register_indexes("users", IndexModel([("email", 1)], unique=True))
+
+register_indexes(
+    "listings",
+    # Geospatial index for /nearby
+    IndexModel([("location", "2dsphere")]),
+    # Provider's own listings, newest first
+    IndexModel([("owner_id", 1), ("created_at", -1), ("_id", -1)]),
+    # Browse: one index per (equality filters, sort key) combination so every query is an
+    # index range scan in sort order. Price bounds are a range on the price sort key, or a
+    # filter on the index scan when sorting by newest. Browse queries run with the
+    # case-insensitive collation, so these indexes must use it too.
+    IndexModel([("created_at", -1), ("_id", -1)], collation=CASE_INSENSITIVE, name="browse_ci_created_at_id"),
+    IndexModel([("city", 1), ("created_at", -1), ("_id", -1)], collation=CASE_INSENSITIVE, name="city_ci_created_at_id"),
+    IndexModel([("vehicle_size", 1), ("created_at", -1), ("_id", -1)], collation=CASE_INSENSITIVE, name="size_ci_created_at_id"),
+    IndexModel(
+        [("city", 1), ("vehicle_size", 1), ("created_at", -1), ("_id", -1)],
+        collation=CASE_INSENSITIVE, name="city_size_ci_created_at_id",
+    ),
+    IndexModel([("price_per_hour", 1), ("_id", 1)], collation=CASE_INSENSITIVE, name="browse_ci_price_id"),
+    IndexModel([("city", 1), ("price_per_hour", 1), ("_id", 1)], collation=CASE_INSENSITIVE, name="city_ci_price_id"),
+    IndexModel([("vehicle_size", 1), ("price_per_hour", 1), ("_id", 1)], collation=CASE_INSENSITIVE, name="size_ci_price_id"),
+    IndexModel(
+        [("city", 1), ("vehicle_size", 1), ("price_per_hour", 1), ("_id", 1)],
+        collation=CASE_INSENSITIVE, name="city_size_ci_price_id",
+    ),
+    # Relevance-ranked free-text search (q=)
+    IndexModel(
+        [("title", "text"), ("address", "text"), ("description", "text")],
+        weights={"title": 10, "address": 5, "description": 1},
+        name="listing_text",
+    ),
+)
+
+register_indexes(
+    "bookings",
+    IndexModel([("renter_id", 1), ("created_at", -1), ("_id", -1)]),
+    # Expiry sweep: active bookings in end_time order
+    IndexModel([("status", 1), ("end_time", 1)]),
+)
+
+register_indexes(
+    "listing_occupancy",
+    # Pruning past days (lookups go by _id = listing_id:day)
+    IndexModel([("day", 1)]),
+)
+
+register_indexes(
+    "listing_daily_stats",
+    # Provider dashboard: one owner's rollups over a day range
+    IndexModel([("owner_id", 1), ("day", 1)]),
+)
+
+# Only the fields the response models serialize (drops e.g. the GeoJSON location)
+LISTING_PROJECTION = projection_for(ListingResponse)
+# owner_id is not in the response but lets /api/bookings/mine expand the owner
+BOOKING_PROJECTION = projection_for(BookingResponse, "owner_id")
+
+STREAM_BATCH_SIZE = 500
+
+def build_location(latitude: Optional[float], longitude: Optional[float]):
+    # GeoJSON point backing the 2dsphere index (note: [lng, lat] order)
+    if latitude is None or longitude is None:
+        return None
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+def exact_ci(value: str) -> dict:
+    # Case-insensitive equality for queries that cannot use the CASE_INSENSITIVE collation
+    return {"$regex": f"^{re.escape(value)}$", "$options": "i"}
+
+def build_browse_query(filters: ListingFilters) -> dict:
+    # Run with CASE_INSENSITIVE so city/vehicle_size are case-insensitive equalities on the collated indexes
+    query = {}
+    if filters.city:
+        query["city"] = filters.city
+    if filters.vehicle_size:
+        query["vehicle_size"] = filters.vehicle_size
+    if filters.min_price is not None or filters.max_price is not None:
+        query["price_per_hour"] = {}
+        if filters.min_price is not None:
+            query["price_per_hour"]["$gte"] = filters.min_price
+        if filters.max_price is not None:
+            query["price_per_hour"]["$lte"] = filters.max_price
+    return query
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, db):
+        self.collection = db.users
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": user_id})
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email})
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, dict]:
+        cursor = self.collection.find({"_id": {"$in": user_ids}}, {"password_hash": 0}, batch_size=len(user_ids) or 1)
+        return {doc["_id"]: doc async for doc in cursor}
+
+    async def create(self, user: dict):
+        try:
+            # The unique index on email rejects duplicates atomically
+            await self.collection.insert_one(user)
+        except DuplicateKeyError as e:
+            raise DuplicateError("email") from e
+
+    async def update(self, user_id: str, fields: dict):
+        try:
+            await self.collection.update_one({"_id": user_id}, {"$set": fields})
+        except DuplicateKeyError as e:
+            raise DuplicateError("email") from e
+
+class MongoListingRepository(ListingRepository):
+    def __init__(self, db):
+        self.collection = db.listings
+
+    async def get(self, listing_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": listing_id})
+
+    async def create(self, listing: dict):
+        await self.collection.insert_one({**listing, "location": build_location(listing.get("latitude"), listing.get("longitude"))})
+
+    async def prices(self, listing_ids: List[str]) -> Dict[str, float]:
+        cursor = self.collection.find({"_id": {"$in": listing_ids}}, {"price_per_hour": 1}, batch_size=len(listing_ids) or 1)
+        return {doc["_id"]: doc["price_per_hour"] async for doc in cursor}
+
+    async def create_many(self, listings: List[dict]) -> Dict[int, str]:
+        docs = [{**listing, "location": build_location(listing.get("latitude"), listing.get("longitude"))} for listing in listings]
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            return {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+        return {}
+
+    async def backfill_locations(self) -> int:
+        """Add the GeoJSON ``location`` to listings stored before it existed, so /nearby
+        finds them; returns how many were updated."""
+        updated = 0
+        batch = []
+        cursor = self.collection.find({"location": {"$exists": False}}, {"latitude": 1, "longitude": 1}, batch_size=STREAM_BATCH_SIZE)
+        async for listing in cursor:
+            batch.append(listing)
+            if len(batch) == STREAM_BATCH_SIZE:
+                updated += await self._write_locations(batch)
+                batch = []
+        if batch:
+            updated += await self._write_locations(batch)
+        return updated
+
+    async def _write_locations(self, listings: List[dict]) -> int:
+        updates = [
+            UpdateOne(
+                {"_id": listing["_id"], "location": {"$exists": False}},
+                {"$set": {"location": build_location(listing.get("latitude"), listing.get("longitude"))}}
+            )
+            for listing in listings
+        ]
+        try:
+            return (await self.collection.bulk_write(updates, ordered=False)).modified_count
+        except BulkWriteError as e:
+            # e.g. coordinates out of range, which the 2dsphere index rejects
+            for err in e.details.get("writeErrors", []):
+                print(f"⚠️ No location for listing {listings[err['index']]['_id']}: {err.get('errmsg')}")
+            return e.details.get("nModified", 0)
+
+    async def update(self, listing: dict, fields: dict) -> dict:
+        fields = dict(fields)
+        # Keep the GeoJSON point in sync with latitude/longitude
+        if "latitude" in fields or "longitude" in fields:
+            merged = {**listing, **fields}
+            fields["location"] = build_location(merged.get("latitude"), merged.get("longitude"))
+        await self.collection.update_one({"_id": listing["_id"]}, {"$set": fields})
+        return await self.collection.find_one({"_id": listing["_id"]})
+
+    async def delete(self, listing_id: str):
+        await self.collection.delete_one({"_id": listing_id})
+
+    async def browse(self, filters: ListingFilters, sort: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        return await fetch_page(
+            self.collection, build_browse_query(filters), limit, cursor,
+            sort=LISTING_SORTS[sort], collation=CASE_INSENSITIVE, projection=LISTING_PROJECTION
+        )
+
+    async def search(self, q: str, filters: ListingFilters, limit: int) -> List[dict]:
+        query = build_browse_query(ListingFilters(None, None, filters.min_price, filters.max_price))
+        query["$text"] = {"$search": q}
+        # Text indexes only support the simple collation, so match city and vehicle_size
+        # with anchored case-insensitive regexes applied to the text index's candidates
+        if filters.city:
+            query["city"] = exact_ci(filters.city)
+        if filters.vehicle_size:
+            query["vehicle_size"] = exact_ci(filters.vehicle_size)
+        score = {"$meta": "textScore"}
+        cursor = self.collection.find(query, {**LISTING_PROJECTION, "score": score}).sort([("score", score)]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def nearby(self, lat: float, lng: float, radius_m: float, limit: int, vehicle_size: Optional[str]) -> List[dict]:
+        query = {}
+        if vehicle_size:
+            # The 2dsphere index uses the simple collation, like the text index
+            query["vehicle_size"] = exact_ci(vehicle_size)
+        # $geoNear uses the 2dsphere index on "location" and returns results sorted by distance
+        pipeline = [
+            {
+                "$geoNear": {
+                    "near": {"type": "Point", "coordinates": [lng, lat]},
+                    "distanceField": "distance_m",
+                    "maxDistance": radius_m,
+                    "query": query,
+                    "spherical": True
+                }
+            },
+            {"$limit": limit},
+            {"$project": projection_for(ListingNearbyResponse)}
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
+
+    async def list_by_owner(self, owner_id: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        return await fetch_page(self.collection, {"owner_id": owner_id}, limit, cursor, projection=LISTING_PROJECTION)
+
+    def stream(self, filters: ListingFilters):
+        return self.collection.find(
+            build_browse_query(filters), LISTING_PROJECTION, collation=CASE_INSENSITIVE, batch_size=STREAM_BATCH_SIZE
+        ).sort(NEWEST_FIRST)
+
+    def stream_by_owner(self, owner_id: str):
+        return self.collection.find(
+            {"owner_id": owner_id}, LISTING_PROJECTION, batch_size=STREAM_BATCH_SIZE
+        ).sort(NEWEST_FIRST)
+
+class MongoBookingRepository(BookingRepository):
+    def __init__(self, db):
+        self.collection = db.bookings
+        self.calendars = db.booking_calendars
+        self.occupancy = db.listing_occupancy
+
+    async def get(self, booking_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": booking_id})
+
+    async def reserve_interval(self, listing_id: str, booking_id: str, start_time: datetime, end_time: datetime) -> bool:
+        """Atomically add [start_time, end_time) to the listing's calendar, failing on overlap.
+
+        Each listing has one ``booking_calendars`` document holding the intervals of its
+        active bookings, so the overlap check and the insert are a single-document update
+        and concurrent requests for the same listing cannot both succeed.
+        """
+        # Drop intervals that have already ended so the calendar only holds active bookings.
+        # The upsert filters on _id alone, so concurrent first bookings of a listing cannot
+        # collide creating the calendar; the overlap check below never upserts.
+        await self.calendars.update_one(
+            {"_id": listing_id},
+            {"$pull": {"intervals": {"end": {"$lte": datetime.utcnow()}}}},
+            upsert=True
+        )
+        result = await self.calendars.update_one(
+            {
+                "_id": listing_id,
+                "intervals": {"$not": {"$elemMatch": {"start": {"$lt": end_time}, "end": {"$gt": start_time}}}}
+            },
+            {"$push": {"intervals": {"booking_id": booking_id, "start": start_time, "end": end_time}}}
+        )
+        # No match: an active interval overlaps
+        return result.matched_count == 1
+
+    async def rebuild_calendars(self, replace: bool = False) -> Tuple[int, int]:
+        """Build ``booking_calendars`` from active bookings; returns (bookings, calendars written).
+
+        By default only listings without a calendar get one (safe while serving, run on
+        startup for data from before calendars existed); ``replace`` rewrites every
+        calendar and drops the others, so run it while no bookings are being made.
+        """
+        calendars: Dict[str, List[dict]] = {}
+        count = 0
+        async for booking in self.collection.find(
+            {"status": "active", "end_time": {"$gt": datetime.utcnow()}},
+            {"listing_id": 1, "start_time": 1, "end_time": 1},
+            batch_size=STREAM_BATCH_SIZE
+        ):
+            calendars.setdefault(booking["listing_id"], []).append(
+                {"booking_id": booking["_id"], "start": booking["start_time"], "end": booking["end_time"]}
+            )
+            count += 1
+        # Tag every rewritten calendar so the untagged (stale) ones can be dropped
+        rebuild = str(uuid.uuid4())
+        items = list(calendars.items())
+        written = 0
+        for start in range(0, len(items), STREAM_BATCH_SIZE):
+            batch = items[start:start + STREAM_BATCH_SIZE]
+            if replace:
+                updates = [ReplaceOne({"_id": listing_id}, {"intervals": intervals, "rebuild": rebuild}, upsert=True) for listing_id, intervals in batch]
+            else:
+                updates = [UpdateOne({"_id": listing_id}, {"$setOnInsert": {"intervals": intervals}}, upsert=True) for listing_id, intervals in batch]
+            result = await self.calendars.bulk_write(updates, ordered=False)
+            written += len(batch) if replace else result.upserted_count
+        if replace:
+            await self.calendars.delete_many({"rebuild": {"$ne": rebuild}})
+        return count, written
+
+    async def release_interval(self, listing_id: str, booking_id: str):
+        await self.calendars.update_one(
+            {"_id": listing_id},
+            {"$pull": {"intervals": {"booking_id": booking_id}}}
+        )
+
+    async def create(self, booking: dict) -> bool:
+        if not await self.reserve_interval(booking["listing_id"], booking["_id"], booking["start_time"], booking["end_time"]):
+            return False
+        try:
+            await self.collection.insert_one(booking)
+        except Exception:
+            await self.release_interval(booking["listing_id"], booking["_id"])
+            raise
+        await self._update_occupancy(booking, True)
+        return True
+
+    async def _update_occupancy(self, booking: dict, occupied: bool):
+        """Set (or clear) the booking's minutes in the listing's day bitmaps.
+
+        $bit on the hourly words keeps concurrent bookings of one listing-day from
+        overwriting each other. The bookings themselves are authoritative, so a failed
+        update is logged rather than failing the request; rebuild_availability.py repairs it.
+        """
+        listing_id = booking["listing_id"]
+        masks = slot_masks(booking["start_time"], booking["end_time"])
+        updates = []
+        for day, mask in masks.items():
+            bits = {
+                f"hours.{hour}": {"or": Int64(word)} if occupied else {"and": Int64(HOUR_WORD ^ word)}
+                for hour, word in hour_words(mask).items()
+            }
+            update = {"$bit": bits}
+            if occupied:
+                update["$setOnInsert"] = {"listing_id": listing_id, "day": day}
+            updates.append(UpdateOne({"_id": f"{listing_id}:{day}"}, update, upsert=occupied))
+        if not updates:
+            return
+        try:
+            await self.occupancy.bulk_write(updates, ordered=False)
+            if not occupied:
+                await self._restore_shared_slots(booking, masks)
+        except Exception as e:
+            print(f"⚠️ Failed to update availability for listing {listing_id}: {type(e).__name__}: {e}")
+
+    async def _restore_shared_slots(self, booking: dict, masks: Dict[str, int]):
+        """Set again the slots that a cancelled booking shared with active neighbours.
+
+        Runs after clearing and reads the calendar (which no longer holds the booking), so
+        a booking reserved concurrently in the freed time is put back too."""
+        after, before = neighbour_window(booking["start_time"], booking["end_time"])
+        calendar = await self.calendars.find_one({"_id": booking["listing_id"]}, {"intervals": 1})
+        kept = shared_slots(masks, [
+            (interval["start"], interval["end"]) for interval in (calendar or {}).get("intervals", [])
+            if interval["end"] > after and interval["start"] < before
+        ])
+        updates = [
+            UpdateOne(
+                {"_id": f"{booking['listing_id']}:{day}"},
+                {"$bit": {f"hours.{hour}": {"or": Int64(word)} for hour, word in hour_words(mask).items()}}
+            )
+            for day, mask in kept.items()
+        ]
+        if updates:
+            await self.occupancy.bulk_write(updates, ordered=False)
+
+    async def cancel(self, booking: dict) -> bool:
+        result = await self.collection.update_one({"_id": booking["_id"], "status": "active"}, {"$set": {"status": "cancelled"}})
+        if not result.modified_count:
+            return False
+        await self.release_interval(booking["listing_id"], booking["_id"])
+        await self._update_occupancy(booking, False)
+        return True
+
+    async def complete_expired(self, now: datetime, limit: int) -> List[dict]:
+        expired = await self.collection.find(
+            {"status": "active", "end_time": {"$lte": now}},
+            {"status": 0, "created_at": 0}
+        ).sort([("end_time", 1)]).limit(limit).to_list(length=limit)
+        if not expired:
+            return []
+        # Re-check the status per document so a concurrent cancel wins
+        result = await self.collection.bulk_write(
+            [UpdateOne({"_id": doc["_id"], "status": "active"}, {"$set": {"status": "completed"}}) for doc in expired],
+            ordered=False
+        )
+        if result.modified_count < len(expired):
+            completed = await self.collection.distinct(
+                "_id", {"_id": {"$in": [doc["_id"] for doc in expired]}, "status": "completed"}
+            )
+            expired = [doc for doc in expired if doc["_id"] in set(completed)]
+        return expired
+
+    def stream_all(self):
+        return self.collection.find({}, batch_size=STREAM_BATCH_SIZE)
+
+    async def busy_listings(self, listing_ids: List[str], masks: Dict[str, int]) -> Set[str]:
+        busy = set()
+        # Keep each $in list to a few thousand listing-day keys
+        step = max(1, 2000 // max(1, len(masks)))
+        for start in range(0, len(listing_ids), step):
+            keys = [f"{listing_id}:{day}" for listing_id in listing_ids[start:start + step] for day in masks]
+            async for doc in self.occupancy.find({"_id": {"$in": keys}}, {"listing_id": 1, "day": 1, "hours": 1}):
+                if from_hour_words(doc.get("hours", {})) & masks[doc["day"]]:
+                    busy.add(doc["listing_id"])
+        return busy
+
+    async def prune_occupancy(self, before_day: str):
+        await self.occupancy.delete_many({"day": {"$lt": before_day}})
+
+    async def replace_occupancy(self, bitmaps: Dict[Tuple[str, str], int]):
+        # Tag every rewritten bitmap, then drop the untagged (stale) ones
+        rebuild = str(uuid.uuid4())
+        items = list(bitmaps.items())
+        for start in range(0, len(items), STREAM_BATCH_SIZE):
+            await self.occupancy.bulk_write([
+                ReplaceOne(
+                    {"_id": f"{listing_id}:{day}"},
+                    {
+                        "listing_id": listing_id, "day": day, "rebuild": rebuild,
+                        "hours": {hour: Int64(word) for hour, word in hour_words(mask).items()},
+                    },
+                    upsert=True
+                )
+                for (listing_id, day), mask in items[start:start + STREAM_BATCH_SIZE]
+            ], ordered=False)
+        await self.occupancy.delete_many({"rebuild": {"$ne": rebuild}})
+
+    async def list_by_renter(self, renter_id: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        return await fetch_page(self.collection, {"renter_id": renter_id}, limit, cursor, projection=BOOKING_PROJECTION)
+
+class MongoAnalyticsRepository(AnalyticsRepository):
+    def __init__(self, db):
+        self.collection = db.listing_daily_stats
+
+    @staticmethod
+    def _key(row: dict) -> str:
+        return f"{row['listing_id']}:{row['day']}"
+
+    async def apply(self, rows: List[dict]):
+        updates = []
+        for row in rows:
+            increments = {field: row[field] for field in ROLLUP_FIELDS if row.get(field)}
+            if increments:
+                updates.append(UpdateOne(
+                    {"_id": self._key(row)},
+                    {
+                        "$inc": increments,
+                        "$setOnInsert": {"listing_id": row["listing_id"], "owner_id": row["owner_id"], "day": row["day"]},
+                    },
+                    upsert=True
+                ))
+        if updates:
+            await self.collection.bulk_write(updates, ordered=False)
+
+    async def replace_all(self, rows: List[dict]):
+        # Tag every rewritten rollup, then drop the untagged (stale) ones
+        rebuild = str(uuid.uuid4())
+        for start in range(0, len(rows), STREAM_BATCH_SIZE):
+            await self.collection.bulk_write([
+                ReplaceOne(
+                    {"_id": self._key(row)},
+                    {**{field: row.get(field, 0) for field in ("listing_id", "owner_id", "day") + ROLLUP_FIELDS}, "rebuild": rebuild},
+                    upsert=True
+                )
+                for row in rows[start:start + STREAM_BATCH_SIZE]
+            ], ordered=False)
+        await self.collection.delete_many({"rebuild": {"$ne": rebuild}})
+
+    async def list_by_owner(self, owner_id: str, first_day: str, last_day: str) -> List[dict]:
+        cursor = self.collection.find({"owner_id": owner_id, "day": {"$gte": first_day, "$lte": last_day}}, {"_id": 0, "rebuild": 0})
+        return sorted(await cursor.to_list(length=None), key=lambda row: (row["listing_id"], row["day"]))
+
+    async def exists(self) -> bool:
+        return await self.collection.find_one({}, {"_id": 1}) is not None
+
+class MongoRepositories(Repositories):
+    def __init__(self, client, db):
+        super().__init__(
+            users=MongoUserRepository(db),
+            listings=MongoListingRepository(db),
+            bookings=MongoBookingRepository(db),
+            analytics=MongoAnalyticsRepository(db),
+        )
+        self.client = client
+        self.db = db
+
+    async def ping(self):
+        await self.client.admin.command("ping")
+
+    async def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.db.leases.update_one(
+                {"_id": name, "$or": [{"holder": holder}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The lease exists and another holder's term has not expired
+            return False
+        return True
@@ -0,0 +1,698 @@
+import asyncio
+import json
+import math
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.availability import neighbour_window, shared_slots, slot_masks, SLOT_BYTES
+from app.core.pagination import clamp_limit, decode_cursor, encode_cursor, NEWEST_FIRST
+from .base import (
+    AnalyticsRepository, BookingRepository, DuplicateError, ListingFilters, ListingRepository, LISTING_SORTS,
+    Page, Repositories, ROLLUP_FIELDS, UserRepository,
+)
+
+# Same layout as the SQLAlchemy-era smartpark.db, so an existing file opens as is
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id VARCHAR NOT NULL PRIMARY KEY,
+    email VARCHAR NOT NULL,
+    password_hash VARCHAR NOT NULL,
+    role VARCHAR NOT NULL,
+    created_at DATETIME
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS listings (
+    id VARCHAR NOT NULL PRIMARY KEY,
+    owner_id VARCHAR NOT NULL,
+    title VARCHAR NOT NULL,
+    description VARCHAR,
+    address VARCHAR NOT NULL,
+    city VARCHAR,
+    price_per_hour FLOAT NOT NULL,
+    vehicle_size VARCHAR,
+    latitude FLOAT,
+    longitude FLOAT,
+    images JSON,
+    created_at DATETIME,
+    updated_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS ix_listings_owner_created ON listings (owner_id, created_at DESC, id DESC);
+-- Browse: one index per (equality filters, sort key) combination, mirroring the Mongo ones
+CREATE INDEX IF NOT EXISTS ix_listings_created ON listings (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_listings_city_created ON listings (city COLLATE NOCASE, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_listings_size_created ON listings (vehicle_size COLLATE NOCASE, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_listings_city_size_created
+    ON listings (city COLLATE NOCASE, vehicle_size COLLATE NOCASE, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_listings_price ON listings (price_per_hour, id);
+CREATE INDEX IF NOT EXISTS ix_listings_city_price ON listings (city COLLATE NOCASE, price_per_hour, id);
+CREATE INDEX IF NOT EXISTS ix_listings_size_price ON listings (vehicle_size COLLATE NOCASE, price_per_hour, id);
+CREATE INDEX IF NOT EXISTS ix_listings_city_size_price
+    ON listings (city COLLATE NOCASE, vehicle_size COLLATE NOCASE, price_per_hour, id);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id VARCHAR NOT NULL PRIMARY KEY,
+    listing_id VARCHAR NOT NULL,
+    renter_id VARCHAR NOT NULL,
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
+    status VARCHAR,
+    created_at DATETIME,
+    owner_id VARCHAR,
+    price_per_hour FLOAT,
+    amount FLOAT
+);
+CREATE INDEX IF NOT EXISTS ix_bookings_renter_created ON bookings (renter_id, created_at DESC, id DESC);
+-- Overlap checks only touch a listing's active bookings that end after the requested start
+CREATE INDEX IF NOT EXISTS ix_bookings_listing_active ON bookings (listing_id, status, end_time);
+-- Expiry sweep: active bookings in end_time order
+CREATE INDEX IF NOT EXISTS ix_bookings_status_end ON bookings (status, end_time);
+
+CREATE TABLE IF NOT EXISTS listing_daily_stats (
+    listing_id VARCHAR NOT NULL,
+    day VARCHAR NOT NULL,
+    owner_id VARCHAR NOT NULL,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    hours FLOAT NOT NULL DEFAULT 0,
+    revenue FLOAT NOT NULL DEFAULT 0,
+    PRIMARY KEY (listing_id, day)
+);
+CREATE INDEX IF NOT EXISTS ix_listing_daily_stats_owner_day ON listing_daily_stats (owner_id, day);
+
+-- Availability search: per listing per day bitmap of booked minutes (see app.core.availability)
+CREATE TABLE IF NOT EXISTS listing_occupancy (
+    listing_id VARCHAR NOT NULL,
+    day VARCHAR NOT NULL,
+    slots BLOB NOT NULL,
+    PRIMARY KEY (listing_id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_listing_occupancy_day ON listing_occupancy (day);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name VARCHAR NOT NULL PRIMARY KEY,
+    holder VARCHAR NOT NULL,
+    expires_at DATETIME NOT NULL
+);
+"""
+
+# Full-text and spatial indexes. listings has no INTEGER PRIMARY KEY (its rowid may change
+# on VACUUM), so listing_keys assigns each listing a stable integer key for them.
+SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listing_keys (
+    key INTEGER PRIMARY KEY,
+    listing_id VARCHAR NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(title, address, description);
+CREATE VIRTUAL TABLE IF NOT EXISTS listings_geo USING rtree(key, min_lat, max_lat, min_lng, max_lng);
+
+CREATE TRIGGER IF NOT EXISTS listings_search_insert AFTER INSERT ON listings BEGIN
+    INSERT INTO listing_keys (listing_id) VALUES (new.id);
+    INSERT INTO listings_fts (rowid, title, address, description)
+        SELECT key, new.title, new.address, new.description FROM listing_keys WHERE listing_id = new.id;
+    INSERT INTO listings_geo
+        SELECT key, new.latitude, new.latitude, new.longitude, new.longitude FROM listing_keys
+        WHERE listing_id = new.id AND new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS listings_search_update
+AFTER UPDATE OF title, address, description, latitude, longitude ON listings BEGIN
+    UPDATE listings_fts SET title = new.title, address = new.address, description = new.description
+        WHERE rowid = (SELECT key FROM listing_keys WHERE listing_id = new.id);
+    DELETE FROM listings_geo WHERE key = (SELECT key FROM listing_keys WHERE listing_id = new.id);
+    INSERT INTO listings_geo
+        SELECT key, new.latitude, new.latitude, new.longitude, new.longitude FROM listing_keys
+        WHERE listing_id = new.id AND new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS listings_search_delete AFTER DELETE ON listings BEGIN
+    DELETE FROM listings_fts WHERE rowid = (SELECT key FROM listing_keys WHERE listing_id = old.id);
+    DELETE FROM listings_geo WHERE key = (SELECT key FROM listing_keys WHERE listing_id = old.id);
+    DELETE FROM listing_keys WHERE listing_id = old.id;
+END;
+"""
+
+# Columns added since the legacy schema; created on open when missing
+ADDED_COLUMNS = {
+    "bookings": [("owner_id", "VARCHAR"), ("price_per_hour", "FLOAT"), ("amount", "FLOAT")],
+}
+
+# The legacy schema stored whole-second timestamps ('2025-11-26 14:51:01'). Cursors and
+# interval checks compare the text form, so every value must carry DATETIME_FORMAT's
+# microseconds for text order to match time order.
+LEGACY_DATETIME_COLUMNS = {
+    "users": ["created_at"],
+    "listings": ["created_at", "updated_at"],
+    "bookings": ["start_time", "end_time", "created_at"],
+}
+
+BACKFILL_SEARCH = """
+INSERT INTO listing_keys (listing_id) SELECT id FROM listings WHERE id NOT IN (SELECT listing_id FROM listing_keys);
+DELETE FROM listings_fts;
+INSERT INTO listings_fts (rowid, title, address, description)
+    SELECT k.key, l.title, l.address, l.description FROM listings l JOIN listing_keys k ON k.listing_id = l.id;
+DELETE FROM listings_geo;
+INSERT INTO listings_geo
+    SELECT k.key, l.latitude, l.latitude, l.longitude, l.longitude FROM listings l JOIN listing_keys k ON k.listing_id = l.id
+    WHERE l.latitude IS NOT NULL AND l.longitude IS NOT NULL;
+"""
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Mongo's spherical distances use this radius
+EARTH_RADIUS_M = 6378100.0
+STREAM_BATCH_SIZE = 500
+
+LISTING_COLUMNS = (
+    "id", "owner_id", "title", "description", "address", "city", "price_per_hour",
+    "vehicle_size", "latitude", "longitude", "images", "created_at", "updated_at",
+)
+USER_COLUMNS = ("id", "email", "password_hash", "role", "created_at")
+BOOKING_COLUMNS = (
+    "id", "listing_id", "renter_id", "start_time", "end_time", "status", "created_at",
+    "owner_id", "price_per_hour", "amount",
+)
+DATETIME_FIELDS = {"created_at", "updated_at", "start_time", "end_time"}
+
+def database_path(url: str) -> str:
+    # sqlite:///./smartpark.db -> ./smartpark.db, sqlite:///:memory: -> :memory:
+    if not url.startswith("sqlite:///"):
+        raise ValueError(f"Not a SQLite URL: {url}")
+    return url[len("sqlite:///"):]
+
+def to_db_value(field: str, value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            # Stored as naive UTC, like Mongo dates
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime(DATETIME_FORMAT)
+    if field == "images":
+        return json.dumps(value or [])
+    return value
+
+def to_document(row: sqlite3.Row) -> dict:
+    doc = {}
+    for key in row.keys():
+        value = row[key]
+        if key == "id":
+            key = "_id"
+        elif key in DATETIME_FIELDS and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif key == "images":
+            value = json.loads(value) if value else []
+        doc[key] = value
+    return doc
+
+def to_row(doc: dict, columns) -> tuple:
+    values = {"id" if key == "_id" else key: value for key, value in doc.items()}
+    return tuple(to_db_value(column, values.get(column)) for column in columns)
+
+def fts_query(q: str) -> Optional[str]:
+    # Quote each term so user input is never parsed as FTS syntax; any term may match
+    terms = re.findall(r"\w+", q)
+    return " OR ".join(f'"{term}"' for term in terms) if terms else None
+
+class SQLiteStore:
+    """One connection driven by a single worker thread, so statements never block the
+    event loop and are naturally serialized; BEGIN IMMEDIATE makes multi-statement
+    writes atomic against other processes sharing the file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Upgrade legacy tables before the schema script indexes any new columns
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns:
+                if existing and column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        conn.executescript(SCHEMA)
+        for table, columns in LEGACY_DATETIME_COLUMNS.items():
+            for column in columns:
+                conn.execute(f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19")
+        has_search = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'listing_keys'").fetchone()
+        conn.executescript(SEARCH_SCHEMA)
+        if not has_search:
+            conn.executescript(BACKFILL_SEARCH)
+        self.conn = conn
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def open(self):
+        await self.run(self._open)
+
+    async def close(self):
+        if self.conn is not None:
+            await self.run(self.conn.close)
+        self._executor.shutdown(wait=False)
+
+    async def fetch_one(self, sql: str, params=()) -> Optional[dict]:
+        def query():
+            row = self.conn.execute(sql, params).fetchone()
+            return to_document(row) if row else None
+        return await self.run(query)
+
+    async def fetch_all(self, sql: str, params=()) -> List[dict]:
+        def query():
+            return [to_document(row) for row in self.conn.execute(sql, params).fetchall()]
+        return await self.run(query)
+
+    async def fetch_in(self, sql: str, ids: List[str], params=()) -> List[dict]:
+        """Rows for ``sql`` with ``{}`` standing for an ``IN`` list of ``ids`` (bound before
+        ``params``), queried in chunks that stay well under SQLite's bound-parameter limit."""
+        def query():
+            docs = []
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self.conn.execute(sql.format(", ".join("?" for _ in chunk)), [*chunk, *params])
+                docs.extend(to_document(row) for row in rows)
+            return docs
+        return await self.run(query)
+
+    async def execute(self, sql: str, params=()):
+        await self.run(self.conn.execute, sql, params)
+
+def _page_sql(table: str, columns, where: List[str], params: list, sort, limit: int, cursor: Optional[str]):
+    """SELECT for one keyset page. All supported sorts use a single direction, so the
+    cursor condition is a row-value comparison an index on the sort columns can seek to."""
+    db_columns = ["id" if field == "_id" else field for field, _ in sort]
+    descending = sort[0][1] < 0
+    where = list(where)
+    params = list(params)
+    if cursor:
+        values = decode_cursor(sort, cursor)
+        placeholders = ", ".join("?" for _ in values)
+        where.append(f"({', '.join(db_columns)}) {'<' if descending else '>'} ({placeholders})")
+        params.extend(to_db_value(field, value) for (field, _), value in zip(sort, values))
+    order = ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column in db_columns)
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} LIMIT ?"
+    return sql, params + [limit + 1]
+
+async def _fetch_page(store: SQLiteStore, table: str, columns, where, params, sort, limit: int, cursor) -> Page:
+    sql, params = _page_sql(table, columns, where, params, sort, limit, cursor)
+    docs = await store.fetch_all(sql, params)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(sort, docs[-1])
+    return docs, next_cursor
+
+def _listing_where(filters: ListingFilters, prefix: str = "", price_sorted: bool = True):
+    where, params = [], []
+    # Unless results are ordered by price, keep the planner on the created_at index (and
+    # its sort order) by making the price bounds plain filters: unary + disables an index
+    price = f"{prefix}price_per_hour" if price_sorted else f"+{prefix}price_per_hour"
+    if filters.city:
+        where.append(f"{prefix}city = ? COLLATE NOCASE")
+        params.append(filters.city)
+    if filters.vehicle_size:
+        where.append(f"{prefix}vehicle_size = ? COLLATE NOCASE")
+        params.append(filters.vehicle_size)
+    if filters.min_price is not None:
+        where.append(f"{price} >= ?")
+        params.append(filters.min_price)
+    if filters.max_price is not None:
+        where.append(f"{price} <= ?")
+        params.append(filters.max_price)
+    return where, params
+
+def _update_occupancy(conn: sqlite3.Connection, booking: dict, occupied: bool):
+    # Callers hold the write lock, so read-modify-write of a day's bitmap is atomic
+    masks = slot_masks(booking["start_time"], booking["end_time"])
+    kept = {}
+    if not occupied:
+        # Keep the slots of active neighbours that share a minute with the booking
+        after, before = neighbour_window(booking["start_time"], booking["end_time"])
+        rows = conn.execute(
+            "SELECT start_time, end_time FROM bookings "
+            "WHERE listing_id = ? AND status = 'active' AND id != ? AND end_time > ? AND start_time < ?",
+            (booking["listing_id"], booking["_id"], to_db_value("end_time", after), to_db_value("start_time", before)),
+        ).fetchall()
+        kept = shared_slots(masks, [
+            (datetime.fromisoformat(row["start_time"]), datetime.fromisoformat(row["end_time"])) for row in rows
+        ])
+    for day, mask in masks.items():
+        row = conn.execute(
+            "SELECT slots FROM listing_occupancy WHERE listing_id = ? AND day = ?", (booking["listing_id"], day)
+        ).fetchone()
+        slots = int.from_bytes(row["slots"], "little") if row else 0
+        slots = slots | mask if occupied else slots & ~(mask & ~kept.get(day, 0))
+        conn.execute(
+            "INSERT INTO listing_occupancy (listing_id, day, slots) VALUES (?, ?, ?) "
+            "ON CONFLICT (listing_id, day) DO UPDATE SET slots = excluded.slots",
+            (booking["listing_id"], day, slots.to_bytes(SLOT_BYTES, "little")),
+        )
+
+def _set_clause(fields: dict, allowed) -> tuple:
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    assignments = ", ".join(f"{field} = ?" for field in fields)
+    return assignments, [to_db_value(field, value) for field, value in fields.items()]
+
+class SQLiteUserRepository(UserRepository):
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return await self.store.fetch_one("SELECT * FROM users WHERE id = ?", (user_id,))
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return await self.store.fetch_one("SELECT * FROM users WHERE email = ?", (email,))
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, dict]:
+        docs = await self.store.fetch_in("SELECT id, email, role, created_at FROM users WHERE id IN ({})", user_ids)
+        return {doc["_id"]: doc for doc in docs}
+
+    async def create(self, user: dict):
+        try:
+            await self.store.execute(
+                f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' for _ in USER_COLUMNS)})",
+                to_row(user, USER_COLUMNS),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError("email") from e
+
+    async def update(self, user_id: str, fields: dict):
+        assignments, params = _set_clause(fields, USER_COLUMNS[1:])
+        try:
+            await self.store.execute(f"UPDATE users SET {assignments} WHERE id = ?", (*params, user_id))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateError("email") from e
+
+class SQLiteListingRepository(ListingRepository):
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    async def get(self, listing_id: str) -> Optional[dict]:
+        return await self.store.fetch_one("SELECT * FROM listings WHERE id = ?", (listing_id,))
+
+    async def create(self, listing: dict):
+        await self.store.execute(
+            f"INSERT INTO listings ({', '.join(LISTING_COLUMNS)}) VALUES ({', '.join('?' for _ in LISTING_COLUMNS)})",
+            to_row(listing, LISTING_COLUMNS),
+        )
+
+    async def prices(self, listing_ids: List[str]) -> Dict[str, float]:
+        docs = await self.store.fetch_in("SELECT id, price_per_hour FROM listings WHERE id IN ({})", listing_ids)
+        return {doc["_id"]: doc["price_per_hour"] for doc in docs}
+
+    async def create_many(self, listings: List[dict]) -> Dict[int, str]:
+        sql = f"INSERT INTO listings ({', '.join(LISTING_COLUMNS)}) VALUES ({', '.join('?' for _ in LISTING_COLUMNS)})"
+        def insert():
+            failed = {}
+            conn = self.store.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for position, listing in enumerate(listings):
+                    try:
+                        conn.execute(sql, to_row(listing, LISTING_COLUMNS))
+                    except sqlite3.IntegrityError as e:
+                        failed[position] = str(e)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return failed
+        return await self.store.run(insert)
+
+    async def update(self, listing: dict, fields: dict) -> dict:
+        assignments, params = _set_clause(fields, LISTING_COLUMNS[1:])
+        await self.store.execute(f"UPDATE listings SET {assignments} WHERE id = ?", (*params, listing["_id"]))
+        return await self.get(listing["_id"])
+
+    async def delete(self, listing_id: str):
+        await self.store.execute("DELETE FROM listings WHERE id = ?", (listing_id,))
+
+    async def _page(self, where, params, sort, limit: int, cursor: Optional[str]) -> Page:
+        return await _fetch_page(self.store, "listings", LISTING_COLUMNS, where, params, sort, limit, cursor)
+
+    async def browse(self, filters: ListingFilters, sort: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        where, params = _listing_where(filters, price_sorted=sort != "newest")
+        return await self._page(where, params, LISTING_SORTS[sort], clamp_limit(limit), cursor)
+
+    async def search(self, q: str, filters: ListingFilters, limit: int) -> List[dict]:
+        match = fts_query(q)
+        if match is None:
+            return []
+        where, params = _listing_where(filters, prefix="l.")
+        columns = ", ".join(f"l.{column}" for column in LISTING_COLUMNS)
+        sql = (
+            f"SELECT {columns} FROM listings_fts f "
+            "JOIN listing_keys k ON k.key = f.rowid JOIN listings l ON l.id = k.listing_id "
+            f"WHERE listings_fts MATCH ? {''.join(' AND ' + clause for clause in where)} "
+            # Same field weights as the Mongo text index; bm25 is lower-is-better
+            "ORDER BY bm25(listings_fts, 10.0, 5.0, 1.0) LIMIT ?"
+        )
+        return await self.store.fetch_all(sql, [match, *params, limit])
+
+    async def nearby(self, lat: float, lng: float, radius_m: float, limit: int, vehicle_size: Optional[str]) -> List[dict]:
+        # Bounding-box candidates from the R*Tree, then exact great-circle distances
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        dlng = min(180.0, dlat / max(math.cos(math.radians(lat)), 1e-6))
+        where, params = _listing_where(ListingFilters(vehicle_size=vehicle_size), prefix="l.")
+        columns = ", ".join(f"l.{column}" for column in LISTING_COLUMNS)
+        sql = (
+            f"SELECT {columns} FROM listings_geo g "
+            "JOIN listing_keys k ON k.key = g.key JOIN listings l ON l.id = k.listing_id "
+            "WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lng >= ? AND g.min_lng <= ?"
+            f"{''.join(' AND ' + clause for clause in where)}"
+        )
+        candidates = await self.store.fetch_all(sql, [lat - dlat, lat + dlat, lng - dlng, lng + dlng, *params])
+
+        lat1, lng1 = math.radians(lat), math.radians(lng)
+        results = []
+        for doc in candidates:
+            lat2, lng2 = math.radians(doc["latitude"]), math.radians(doc["longitude"])
+            a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+            distance = 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+            if distance <= radius_m:
+                doc["distance_m"] = distance
+                results.append(doc)
+        results.sort(key=lambda doc: doc["distance_m"])
+        return results[:limit]
+
+    async def list_by_owner(self, owner_id: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        return await self._page(["owner_id = ?"], [owner_id], NEWEST_FIRST, clamp_limit(limit), cursor)
+
+    async def _stream(self, where, params):
+        cursor = None
+        while True:
+            docs, cursor = await self._page(where, params, NEWEST_FIRST, STREAM_BATCH_SIZE, cursor)
+            for doc in docs:
+                yield doc
+            if cursor is None:
+                return
+
+    def stream(self, filters: ListingFilters):
+        return self._stream(*_listing_where(filters))
+
+    def stream_by_owner(self, owner_id: str):
+        return self._stream(["owner_id = ?"], [owner_id])
+
+class SQLiteBookingRepository(BookingRepository):
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    async def get(self, booking_id: str) -> Optional[dict]:
+        return await self.store.fetch_one("SELECT * FROM bookings WHERE id = ?", (booking_id,))
+
+    async def create(self, booking: dict) -> bool:
+        row = to_row(booking, BOOKING_COLUMNS)
+        start_time, end_time = row[3], row[4]
+        def reserve():
+            conn = self.store.conn
+            # The write lock is held from the overlap check through the insert
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                overlap = conn.execute(
+                    "SELECT 1 FROM bookings WHERE listing_id = ? AND status = 'active' "
+                    "AND end_time > ? AND start_time < ? LIMIT 1",
+                    (booking["listing_id"], start_time, end_time),
+                ).fetchone()
+                if overlap is None:
+                    conn.execute(
+                        f"INSERT INTO bookings ({', '.join(BOOKING_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' for _ in BOOKING_COLUMNS)})",
+                        row,
+                    )
+                    _update_occupancy(conn, booking, True)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return overlap is None
+        return await self.store.run(reserve)
+
+    async def cancel(self, booking: dict) -> bool:
+        def cancel():
+            conn = self.store.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    "UPDATE bookings SET status = 'cancelled' WHERE id = ? AND status = 'active'", (booking["_id"],)
+                )
+                cancelled = cursor.rowcount == 1
+                if cancelled:
+                    _update_occupancy(conn, booking, False)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return cancelled
+        return await self.store.run(cancel)
+
+    async def complete_expired(self, now: datetime, limit: int) -> List[dict]:
+        def complete():
+            conn = self.store.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    f"SELECT {', '.join(column for column in BOOKING_COLUMNS if column not in ('status', 'created_at'))} FROM bookings "
+                    "WHERE status = 'active' AND end_time <= ? ORDER BY end_time LIMIT ?",
+                    (to_db_value("end_time", now), limit),
+                ).fetchall()
+                conn.executemany("UPDATE bookings SET status = 'completed' WHERE id = ?", [(row["id"],) for row in rows])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return [to_document(row) for row in rows]
+        return await self.store.run(complete)
+
+    async def busy_listings(self, listing_ids: List[str], masks: Dict[str, int]) -> Set[str]:
+        if not masks:
+            return set()
+        rows = await self.store.fetch_in(
+            "SELECT listing_id, day, slots FROM listing_occupancy WHERE listing_id IN ({}) AND day BETWEEN ? AND ?",
+            listing_ids, (min(masks), max(masks)),
+        )
+        return {
+            row["listing_id"] for row in rows
+            if int.from_bytes(row["slots"], "little") & masks.get(row["day"], 0)
+        }
+
+    async def prune_occupancy(self, before_day: str):
+        await self.store.execute("DELETE FROM listing_occupancy WHERE day < ?", (before_day,))
+
+    async def replace_occupancy(self, bitmaps: Dict[Tuple[str, str], int]):
+        def replace():
+            conn = self.store.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM listing_occupancy")
+                conn.executemany(
+                    "INSERT INTO listing_occupancy (listing_id, day, slots) VALUES (?, ?, ?)",
+                    [(listing_id, day, mask.to_bytes(SLOT_BYTES, "little")) for (listing_id, day), mask in bitmaps.items()],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        await self.store.run(replace)
+
+    async def list_by_renter(self, renter_id: str, limit: Optional[int], cursor: Optional[str]) -> Page:
+        return await _fetch_page(
+            self.store, "bookings", BOOKING_COLUMNS, ["renter_id = ?"], [renter_id],
+            NEWEST_FIRST, clamp_limit(limit), cursor
+        )
+
+    async def stream_all(self):
+        cursor = None
+        while True:
+            docs, cursor = await _fetch_page(self.store, "bookings", BOOKING_COLUMNS, [], [], NEWEST_FIRST, STREAM_BATCH_SIZE, cursor)
+            for doc in docs:
+                yield doc
+            if cursor is None:
+                return
+
+class SQLiteAnalyticsRepository(AnalyticsRepository):
+    COLUMNS = ("listing_id", "day", "owner_id") + ROLLUP_FIELDS
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def _write(self, sql: str, rows: List[dict], replace: bool):
+        conn = self.store.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                conn.execute("DELETE FROM listing_daily_stats")
+            conn.executemany(sql, [tuple(row.get(column, 0) for column in self.COLUMNS) for row in rows])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def apply(self, rows: List[dict]):
+        increments = ", ".join(f"{field} = {field} + excluded.{field}" for field in ROLLUP_FIELDS)
+        sql = (
+            f"INSERT INTO listing_daily_stats ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' for _ in self.COLUMNS)}) "
+            f"ON CONFLICT (listing_id, day) DO UPDATE SET {increments}"
+        )
+        await self.store.run(self._write, sql, rows, False)
+
+    async def replace_all(self, rows: List[dict]):
+        sql = f"INSERT INTO listing_daily_stats ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' for _ in self.COLUMNS)})"
+        await self.store.run(self._write, sql, rows, True)
+
+    async def list_by_owner(self, owner_id: str, first_day: str, last_day: str) -> List[dict]:
+        def query():
+            rows = self.store.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM listing_daily_stats "
+                "WHERE owner_id = ? AND day BETWEEN ? AND ? ORDER BY listing_id, day",
+                (owner_id, first_day, last_day),
+            ).fetchall()
+            return [dict(row) for row in rows]
+        return await self.store.run(query)
+
+    async def exists(self) -> bool:
+        return await self.store.fetch_one("SELECT 1 FROM listing_daily_stats LIMIT 1") is not None
+
+class SQLiteRepositories(Repositories):
+    def __init__(self, store: SQLiteStore):
+        super().__init__(
+            users=SQLiteUserRepository(store),
+            listings=SQLiteListingRepository(store),
+            bookings=SQLiteBookingRepository(store),
+            analytics=SQLiteAnalyticsRepository(store),
+        )
+        self.store = store
+
+    async def ping(self):
+        await self.store.fetch_one("SELECT 1 AS ok")
+
+    async def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        now = datetime.utcnow()
+        def acquire():
+            cursor = self.store.conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE leases.holder = excluded.holder OR leases.expires_at <= ?",
+                (name, holder, to_db_value("expires_at", now + timedelta(seconds=seconds)), to_db_value("expires_at", now)),
+            )
+            return cursor.rowcount == 1
+        return await self.store.run(acquire)
+
+    async def close(self):
+        await self.store.close()
+
+async def open_sqlite_repositories(url: str) -> SQLiteRepositories:
+    store = SQLiteStore(database_path(url))
+    await store.open()
+    return SQLiteRepositories(store)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from app.deps import get_current_provider
+from app.core.analytics import summarize
+from app.core.database import get_repositories
+from datetime import date, datetime, timedelta
+
+router = APIRouter()
+
+MAX_RANGE_DAYS = 366
+
+@router.get("/listings")
+async def get_listing_analytics(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: dict = Depends(get_current_provider)
+):
+    """Bookings, hours, occupancy and revenue per listing per UTC day (default: last 30 days).
+
+    Served from rollups maintained as bookings are created, cancelled and completed, so
+    the cost depends on listings x days rather than on the number of bookings.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RANGE_DAYS} days per request")
+    
+    rows = await get_repositories().analytics.list_by_owner(current_user["_id"], start.isoformat(), end.isoformat())
+    return {"start": start, "end": end, "listings": summarize(rows, start, end)}
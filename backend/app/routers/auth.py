@@ -1,47 +1,59 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from app.schemas.auth import UserRegister, UserLogin, Token
-from app.core.security import get_password_hash, verify_password, create_access_token
-from app.core.database import get_database
+from app.core.security import get_password_hash_async, verify_and_update_password_async, create_access_token
+from app.core.database import get_repositories
+from app.core.ratelimit import auth_admission, check_auth_rate_limits
+from app.repositories.base import DuplicateError
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
 @router.post("/register", response_model=Token)
-async def register(user_in: UserRegister):
-    db = get_database()
+async def register(user_in: UserRegister, request: Request):
+    check_auth_rate_limits(request, user_in.email)
+    repos = get_repositories()
     
-    # Check if user exists
-    existing = await db.users.find_one({"email": user_in.email})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    async with auth_admission:
+        password_hash = await get_password_hash_async(user_in.password)
     
     # Create user
     user_id = str(uuid.uuid4())
     user = {
         "_id": user_id,
         "email": user_in.email,
-        "password_hash": get_password_hash(user_in.password),
+        "password_hash": password_hash,
         "role": user_in.role,
         "created_at": datetime.utcnow()
     }
-    await db.users.insert_one(user)
+    try:
+        await repos.users.create(user)
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     access_token = create_access_token(data={"sub": user_id, "role": user_in.role})
     return {"access_token": access_token, "token_type": "bearer", "user_id": user_id}
 
 @router.post("/login", response_model=Token)
-async def login(user_in: UserLogin):
-    db = get_database()
+async def login(user_in: UserLogin, request: Request):
+    check_auth_rate_limits(request, user_in.email)
+    repos = get_repositories()
     
-    user = await db.users.find_one({"email": user_in.email})
-    if not user or not verify_password(user_in.password, user["password_hash"]):
+    user = await repos.users.get_by_email(user_in.email)
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    async with auth_admission:
+        valid, new_hash = await verify_and_update_password_async(user_in.password, user["password_hash"])
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash used outdated argon2 parameters; upgrade it transparently
+        await repos.users.update(user["_id"], {"password_hash": new_hash})
     
     access_token = create_access_token(data={"sub": user["_id"], "role": user["role"]})
     return {"access_token": access_token, "token_type": "bearer", "user_id": user["_id"]}
 
 # Alias for compatibility
 @router.post("/signup", response_model=Token, include_in_schema=False)
-async def signup_alias(user_in: UserRegister):
-    return await register(user_in)
+async def signup_alias(user_in: UserRegister, request: Request):
+    return await register(user_in, request)
@@ -1,25 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
 from app.deps import get_current_renter
-from app.schemas.booking import BookingCreate, BookingResponse
-from app.core.database import get_database
+from app.schemas.booking import BookingCreate, BookingResponse, BookingExpandedResponse
+from app.core.analytics import record_booking_events, utc_naive
+from app.core.config import settings
+from app.core.database import get_repositories
+from app.core.events import broker
+from app.core.loaders import ProfileLoader, get_profile_loader, parse_expand
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.pricing import quote_amount
+from app.core.serialization import from_documents, json_response
 from datetime import datetime
+from pydantic import TypeAdapter
+import asyncio
 import uuid
 
 router = APIRouter()
 
+booking_list_adapter = TypeAdapter(List[BookingResponse])
+expanded_list_adapter = TypeAdapter(List[BookingExpandedResponse])
+
+def publish_booking(event: str, booking: dict, city: Optional[str]):
+    # Availability only: which interval of which listing, never who booked it
+    data = {
+        "id": booking["_id"],
+        "listing_id": booking["listing_id"],
+        "start_time": utc_naive(booking["start_time"]).isoformat(),
+        "end_time": utc_naive(booking["end_time"]).isoformat(),
+    }
+    broker.publish(event, data, booking["listing_id"], [city])
+
 @router.get("/mine", response_model=List[BookingResponse])
-async def get_my_bookings(current_user: dict = Depends(get_current_renter)):
-    db = get_database()
-    bookings = await db.bookings.find({"renter_id": current_user["_id"]}).to_list(length=100)
-    return [BookingResponse(**{**booking, "id": booking["_id"]}) for booking in bookings]
+async def get_my_bookings(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = Query(None, description="owner and/or renter: embed those profiles"),
+    current_user: dict = Depends(get_current_renter),
+    loader: ProfileLoader = Depends(get_profile_loader)
+):
+    fields = parse_expand(expand, ["owner", "renter"])
+    bookings, next_cursor = await get_repositories().bookings.list_by_renter(current_user["_id"], limit, cursor)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if not fields:
+        return json_response(booking_list_adapter, from_documents(BookingResponse, bookings), headers)
+    
+    # Loads started together coalesce into one users query; bookings made before
+    # owner_id was stored have no owner to embed
+    fields = sorted(fields)
+    profiles = await asyncio.gather(*(
+        loader.load_many([booking.get(f"{field}_id") for booking in bookings]) for field in fields
+    ))
+    for field, field_profiles in zip(fields, profiles):
+        for booking, profile in zip(bookings, field_profiles):
+            booking[field] = profile
+    return json_response(expanded_list_adapter, from_documents(BookingExpandedResponse, bookings), headers)
 
 @router.post("/", response_model=BookingResponse)
 async def create_booking(booking_in: BookingCreate, current_user: dict = Depends(get_current_renter)):
-    db = get_database()
+    # Compare and store as naive UTC: a mix of offset-aware and naive times cannot be compared
+    start_time, end_time = utc_naive(booking_in.start_time), utc_naive(booking_in.end_time)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if (end_time - start_time).total_seconds() > settings.BOOKING_MAX_HOURS * 3600:
+        raise HTTPException(status_code=400, detail=f"Bookings cover at most {settings.BOOKING_MAX_HOURS} hours")
+    
+    repos = get_repositories()
     
     # Verify listing exists
-    listing = await db.listings.find_one({"_id": booking_in.listing_id})
+    listing = await repos.listings.get(booking_in.listing_id)
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
     
@@ -28,23 +76,39 @@ async def create_booking(booking_in: BookingCreate, current_user: dict = Depends
         "_id": booking_id,
         "listing_id": booking_in.listing_id,
         "renter_id": current_user["_id"],
-        "start_time": booking_in.start_time,
-        "end_time": booking_in.end_time,
+        "start_time": start_time,
+        "end_time": end_time,
         "status": "active",
-        "created_at": datetime.utcnow()
+        "created_at": datetime.utcnow(),
+        # Listing owner and price at booking time, for provider analytics
+        "owner_id": listing["owner_id"],
+        "price_per_hour": listing["price_per_hour"],
+        "amount": quote_amount(listing["price_per_hour"], start_time, end_time)
     }
-    await db.bookings.insert_one(booking)
+    # The overlap check and the insert are atomic in every backend
+    if not await repos.bookings.create(booking):
+        raise HTTPException(status_code=409, detail="Listing is already booked for this time")
+    await record_booking_events(repos, [booking], "created")
+    publish_booking("booking.created", booking, listing.get("city"))
     return BookingResponse(**{**booking, "id": booking_id})
 
 @router.delete("/{id}")
 async def cancel_booking(id: str, current_user: dict = Depends(get_current_renter)):
-    db = get_database()
+    repos = get_repositories()
     
-    booking = await db.bookings.find_one({"_id": id})
+    booking = await repos.bookings.get(id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     if booking["renter_id"] != current_user["_id"]:
         raise HTTPException(status_code=403, detail="Not authorized to cancel this booking")
     
-    await db.bookings.update_one({"_id": id}, {"$set": {"status": "cancelled"}})
+    # Only active bookings can be cancelled (also guards against cancelling twice)
+    if not await repos.bookings.cancel(booking):
+        raise HTTPException(status_code=400, detail=f"Booking is already {booking.get('status') or 'closed'}")
+    await record_booking_events(repos, [booking], "cancelled")
+    city = None
+    if broker.has_city_subscribers():
+        listing = await repos.listings.get(booking["listing_id"])
+        city = listing.get("city") if listing else None
+    publish_booking("booking.cancelled", booking, city)
     return {"message": "Booking cancelled"}
@@ -1,63 +1,348 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
-from app.deps import get_current_user, get_current_provider
-from app.schemas.listing import ListingCreate, ListingUpdate, ListingResponse
-from app.core.database import get_database
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from app.deps import get_current_user, get_current_provider, optional_oauth2_scheme, require_user
+from app.schemas.listing import ListingCreate, ListingUpdate, ListingResponse, ListingExpandedResponse, ListingNearbyResponse, QuoteRequest
+from app.core.analytics import utc_naive
+from app.core.availability import availability_window, browse_available, search_available
+from app.core.config import settings
+from app.core.database import get_repositories
+from app.core.events import broker, EVICTED
+from app.core.loaders import ProfileLoader, get_profile_loader, parse_expand
+from app.core.pagination import clamp_limit, NEXT_CURSOR_HEADER
+from app.core.pricing import quote_amounts
+from app.core.response_cache import response_cache
+from app.core.serialization import from_documents, json_response, ndjson_response
+from app.repositories.base import ListingFilters
 from datetime import datetime
+from pydantic import TypeAdapter, ValidationError
+import asyncio
+import csv
+import json
+import numpy as np
 import uuid
 
 router = APIRouter()
 
+listing_list_adapter = TypeAdapter(List[ListingResponse])
+expanded_list_adapter = TypeAdapter(List[ListingExpandedResponse])
+nearby_list_adapter = TypeAdapter(List[ListingNearbyResponse])
+
+def city_scope(city: Optional[str]) -> str:
+    # Cities match case-insensitively, so cache scopes use the folded name
+    return f"city:{city.strip().lower()}" if city else "all"
+
+async def invalidate_listing_cache(listing_id: str, *cities: Optional[str]):
+    scopes = {"all", f"listing:{listing_id}"}
+    scopes.update(city_scope(city) for city in cities if city)
+    await response_cache.invalidate(*scopes)
+
+def listing_payload(listing: dict) -> dict:
+    return ListingResponse(**{**listing, "id": listing["_id"]}).model_dump(mode="json")
+
 @router.get("/", response_model=List[ListingResponse])
 async def get_listings(
+    request: Request,
     city: Optional[str] = None,
-    vehicle_size: Optional[str] = None
+    vehicle_size: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: Optional[Literal["newest", "price", "-price"]] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=200),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="With end: only listings free for the whole window"),
+    end: Optional[datetime] = None,
+    expand: Optional[str] = Query(None, description="owner: embed owner profiles (signed-in users only)"),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    loader: ProfileLoader = Depends(get_profile_loader)
 ):
-    db = get_database()
-    query = {}
+    if q and (cursor or sort):
+        raise HTTPException(status_code=400, detail="cursor and sort are not supported with q; results are ranked by relevance")
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="min_price must not exceed max_price")
     
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}
-    if vehicle_size:
-        query["vehicle_size"] = vehicle_size
+    filters = ListingFilters(city, vehicle_size, min_price, max_price)
+    windowed = availability_window(start, end)
     
-    listings = await db.listings.find(query).to_list(length=100)
-    return [ListingResponse(**{**listing, "id": listing["_id"]}) for listing in listings]
+    async def fetch():
+        repos = get_repositories()
+        if windowed and q:
+            return await search_available(repos, q, filters, limit, start, end), None
+        if windowed:
+            return await browse_available(repos, filters, sort or "newest", limit, cursor, start, end)
+        if q:
+            return await repos.listings.search(q, filters, clamp_limit(limit)), None
+        return await repos.listings.browse(filters, sort or "newest", limit, cursor)
+    
+    expanded = parse_expand(expand, ["owner"])
+    if expanded or windowed:
+        # Availability changes with every booking, and owner emails are only visible to
+        # signed-in users, so these pages skip the shared response cache
+        if expanded:
+            await require_user(token)
+        listings, next_cursor = await fetch()
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        if not expanded:
+            return json_response(listing_list_adapter, from_documents(ListingResponse, listings), headers)
+        owners = await loader.load_many(listing["owner_id"] for listing in listings)
+        for listing, owner in zip(listings, owners):
+            listing["owner"] = owner
+        return json_response(expanded_list_adapter, from_documents(ListingExpandedResponse, listings), headers)
+    
+    scope = city_scope(city)
+    key = await response_cache.versioned_key(
+        f"listings:{scope}:{vehicle_size}:{min_price}:{max_price}:{sort}:{q}:{clamp_limit(limit)}:{cursor}", scope
+    )
+    cached = await response_cache.get(key)
+    if cached is None:
+        listings, next_cursor = await fetch()
+        body = listing_list_adapter.dump_json(from_documents(ListingResponse, listings))
+        cached = await response_cache.set(key, body, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+    return cached.to_response(request)
+
+@router.get("/nearby", response_model=List[ListingNearbyResponse])
+async def get_nearby_listings(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(5000, gt=0, le=50000),
+    limit: int = Query(20, ge=1, le=100),
+    vehicle_size: Optional[str] = None
+):
+    listings = await get_repositories().listings.nearby(lat, lng, radius_m, limit, vehicle_size)
+    return json_response(nearby_list_adapter, from_documents(ListingNearbyResponse, listings))
 
 @router.get("/mine", response_model=List[ListingResponse])
-async def get_my_listings(current_user: dict = Depends(get_current_provider)):
-    db = get_database()
-    listings = await db.listings.find({"owner_id": current_user["_id"]}).to_list(length=100)
-    return [ListingResponse(**{**listing, "id": listing["_id"]}) for listing in listings]
+async def get_my_listings(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_provider)
+):
+    listings, next_cursor = await get_repositories().listings.list_by_owner(current_user["_id"], limit, cursor)
+    return json_response(
+        listing_list_adapter,
+        from_documents(ListingResponse, listings),
+        {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    )
+
+@router.get("/stream")
+async def stream_listings(city: Optional[str] = None, vehicle_size: Optional[str] = None):
+    """All matching listings as NDJSON, newest first, for clients that need the full set."""
+    docs = get_repositories().listings.stream(ListingFilters(city, vehicle_size))
+    return ndjson_response(ListingResponse, docs)
+
+@router.get("/mine/stream")
+async def stream_my_listings(current_user: dict = Depends(get_current_provider)):
+    docs = get_repositories().listings.stream_by_owner(current_user["_id"])
+    return ndjson_response(ListingResponse, docs)
+
+@router.get("/events")
+async def listing_events(
+    request: Request,
+    city: Optional[str] = None,
+    listing_ids: Optional[str] = Query(None, description="Comma-separated listing ids")
+):
+    """Server-sent events for listings in ``city`` and/or ``listing_ids``.
+
+    Events: ``listing.created``/``listing.updated`` (the listing), ``listing.deleted``
+    (``{"id"}``), ``booking.created``/``booking.cancelled`` (the booked interval). A
+    ``ready`` event is sent once subscribed; fetch the current state after it. A client
+    that falls behind gets ``evicted`` and the stream ends; reconnect and refetch.
+    """
+    ids = {listing_id.strip() for listing_id in (listing_ids or "").split(",") if listing_id.strip()}
+    if not city and not ids:
+        raise HTTPException(status_code=400, detail="Subscribe to a city or listing_ids")
+    if len(ids) > settings.EVENTS_MAX_LISTING_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.EVENTS_MAX_LISTING_IDS} listing_ids")
+    
+    async def stream():
+        subscription = broker.subscribe([city] if city else [], ids)
+        try:
+            yield b"event: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), settings.EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line keeps proxies from closing an idle stream
+                    yield b": keepalive\n\n"
+                    continue
+                if message is EVICTED:
+                    yield b"event: evicted\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def new_listing_document(listing_in: ListingCreate, owner_id: str) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": str(uuid.uuid4()),
+        **listing_in.dict(),
+        "owner_id": owner_id,
+        "created_at": now,
+        "updated_at": now
+    }
 
 @router.post("/", response_model=ListingResponse)
 async def create_listing(listing_in: ListingCreate, current_user: dict = Depends(get_current_provider)):
-    db = get_database()
+    listing = new_listing_document(listing_in, current_user["_id"])
+    listing_id = listing["_id"]
+    await get_repositories().listings.create(listing)
+    await invalidate_listing_cache(listing_id, listing["city"])
+    response = ListingResponse(**{**listing, "id": listing_id})
+    broker.publish("listing.created", lambda: response.model_dump(mode="json"), listing_id, [listing["city"]])
+    return response
+
+async def _request_lines(request: Request):
+    # Split the streamed body into raw lines without buffering it whole; each line is
+    # decoded by the caller, so invalid UTF-8 only fails its own row
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+def _csv_row(header: List[str], line: str) -> dict:
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+    row = {key: value for key, value in zip(header, values) if value != ""}
+    if "images" in row:
+        # Multiple image URLs are separated by "|" in CSV
+        row["images"] = [url for url in row["images"].split("|") if url]
+    return row
+
+@router.post("/import")
+async def import_listings(request: Request, current_user: dict = Depends(get_current_provider)):
+    """Bulk-create listings from an NDJSON (default) or CSV (``Content-Type: text/csv``) body.
+
+    Rows are validated as they stream in and written in batches that do not stop at
+    the first failed row, so memory stays flat apart from the per-row report.
+    """
+    repo = get_repositories().listings
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    batch_size = settings.LISTING_IMPORT_BATCH_SIZE
     
-    listing_id = str(uuid.uuid4())
-    listing = {
-        "_id": listing_id,
-        **listing_in.dict(),
-        "owner_id": current_user["_id"],
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+    results = []
+    batch = []  # (result index, document)
+    cities = set()
+    header = None
+    
+    async def flush():
+        failed = await repo.create_many([doc for _, doc in batch])
+        for position, (index, doc) in enumerate(batch):
+            if position in failed:
+                results[index] = {"row": results[index]["row"], "status": "error", "error": failed[position]}
+            else:
+                cities.add(doc.get("city"))
+                broker.publish("listing.created", lambda: listing_payload(doc), doc["_id"], [doc.get("city")])
+        batch.clear()
+    
+    row_number = 0
+    try:
+        async for raw_line in _request_lines(request):
+            if not raw_line.strip():
+                continue
+            try:
+                line = raw_line.decode("utf-8")
+            except UnicodeDecodeError:
+                line = None
+            if is_csv and header is None:
+                if line is None:
+                    raise HTTPException(status_code=400, detail="CSV header is not valid UTF-8")
+                header = [column.strip() for column in next(csv.reader([line]))]
+                continue
+            row_number += 1
+            if row_number > settings.LISTING_IMPORT_MAX_ROWS:
+                # Earlier rows are already written: stop here and report the rest as not imported
+                results.append({
+                    "row": row_number, "status": "error",
+                    "error": f"At most {settings.LISTING_IMPORT_MAX_ROWS} rows per import; this row and any after it were not imported",
+                })
+                break
+            if line is None:
+                results.append({"row": row_number, "status": "error", "error": "not valid UTF-8"})
+                continue
+            try:
+                row = _csv_row(header, line) if is_csv else json.loads(line)
+                listing_in = ListingCreate.model_validate(row)
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                results.append({"row": row_number, "status": "error", "error": error})
+                continue
+            except ValueError as e:
+                results.append({"row": row_number, "status": "error", "error": str(e)})
+                continue
+            doc = new_listing_document(listing_in, current_user["_id"])
+            results.append({"row": row_number, "status": "created", "id": doc["_id"]})
+            batch.append((len(results) - 1, doc))
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+    finally:
+        # Batches written before a failure (or a disconnect) must not stay hidden behind cached pages
+        if cities:
+            await response_cache.invalidate("all", *(city_scope(city) for city in cities if city))
+    
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+@router.post("/quotes")
+async def quote_listings(quote_in: QuoteRequest):
+    """Price the same window for many listings at once (peak/weekend multipliers applied).
+
+    Prices come from one batched lookup and the amounts from one vectorized pass,
+    so comparing thousands of listings costs about as much as a single quote.
+    """
+    # Offset-aware and naive times cannot be compared directly
+    start_time, end_time = utc_naive(quote_in.start_time), utc_naive(quote_in.end_time)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if (end_time - start_time).total_seconds() > settings.QUOTE_MAX_HOURS * 3600:
+        raise HTTPException(status_code=400, detail=f"Quotes cover at most {settings.QUOTE_MAX_HOURS} hours")
+    listing_ids = list(dict.fromkeys(quote_in.listing_ids))
+    if len(listing_ids) > settings.QUOTE_MAX_LISTINGS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.QUOTE_MAX_LISTINGS} listings per quote")
+    
+    prices = await get_repositories().listings.prices(listing_ids)
+    found = [listing_id for listing_id in listing_ids if listing_id in prices]
+    amounts = quote_amounts(np.fromiter((prices[listing_id] for listing_id in found), dtype=np.float64, count=len(found)),
+                            start_time, end_time)
+    return {
+        "start_time": start_time,
+        "end_time": end_time,
+        "quotes": dict(zip(found, amounts.tolist())),
+        "missing": [listing_id for listing_id in listing_ids if listing_id not in prices],
     }
-    await db.listings.insert_one(listing)
-    return ListingResponse(**{**listing, "id": listing_id})
 
 @router.get("/{id}", response_model=ListingResponse)
-async def get_listing(id: str):
-    db = get_database()
-    listing = await db.listings.find_one({"_id": id})
-    if not listing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    return ListingResponse(**{**listing, "id": listing["_id"]})
+async def get_listing(id: str, request: Request):
+    key = await response_cache.versioned_key(f"listing:{id}", f"listing:{id}")
+    cached = await response_cache.get(key)
+    if cached is None:
+        listing = await get_repositories().listings.get(id)
+        if not listing:
+            raise HTTPException(status_code=404, detail="Listing not found")
+        body = ListingResponse(**{**listing, "id": listing["_id"]}).model_dump_json().encode()
+        cached = await response_cache.set(key, body)
+    return cached.to_response(request)
 
 @router.put("/{id}", response_model=ListingResponse)
 async def update_listing(id: str, listing_in: ListingUpdate, current_user: dict = Depends(get_current_provider)):
-    db = get_database()
+    repo = get_repositories().listings
     
-    listing = await db.listings.find_one({"_id": id})
+    listing = await repo.get(id)
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
     if listing["owner_id"] != current_user["_id"]:
@@ -66,19 +351,26 @@ async def update_listing(id: str, listing_in: ListingUpdate, current_user: dict
     update_data = listing_in.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    await db.listings.update_one({"_id": id}, {"$set": update_data})
-    updated_listing = await db.listings.find_one({"_id": id})
-    return ListingResponse(**{**updated_listing, "id": updated_listing["_id"]})
+    updated_listing = await repo.update(listing, update_data)
+    await invalidate_listing_cache(id, listing.get("city"), updated_listing.get("city"))
+    response = ListingResponse(**{**updated_listing, "id": updated_listing["_id"]})
+    # Subscribers of the old city learn that the listing moved away
+    broker.publish(
+        "listing.updated", lambda: response.model_dump(mode="json"), id, [listing.get("city"), updated_listing.get("city")]
+    )
+    return response
 
 @router.delete("/{id}")
 async def delete_listing(id: str, current_user: dict = Depends(get_current_provider)):
-    db = get_database()
+    repo = get_repositories().listings
     
-    listing = await db.listings.find_one({"_id": id})
+    listing = await repo.get(id)
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
     if listing["owner_id"] != current_user["_id"]:
         raise HTTPException(status_code=403, detail="Not authorized to delete this listing")
     
-    await db.listings.delete_one({"_id": id})
+    await repo.delete(id)
+    await invalidate_listing_cache(id, listing.get("city"))
+    broker.publish("listing.deleted", {"id": id}, id, [listing.get("city")])
     return {"message": "Listing deleted"}
@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List
 from app.deps import get_current_user
-from app.core.database import get_database
+from app.core.config import settings
+from app.core.database import get_repositories
+from app.core.cache import user_cache
+from app.core.loaders import profile_summary
+from app.repositories.base import DuplicateError
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -15,36 +20,42 @@ async def upsert_profile(profile: ProfileUpsert, current_user: dict = Depends(ge
     if profile.user_id != current_user["_id"]:
         raise HTTPException(status_code=403, detail="Cannot update another user's profile")
         
-    db = get_database()
-    await db.users.update_one(
-        {"_id": profile.user_id},
-        {"$set": {"email": profile.email, "role": profile.role}}
-    )
+    repos = get_repositories()
+    try:
+        await repos.users.update(profile.user_id, {"email": profile.email, "role": profile.role})
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    user_cache.invalidate(profile.user_id)
     
-    updated_user = await db.users.find_one({"_id": profile.user_id})
-    return {
-        "user_id": updated_user["_id"],
-        "email": updated_user["email"],
-        "role": updated_user["role"]
-    }
+    updated_user = await repos.users.get(profile.user_id)
+    return profile_summary(updated_user)
 
 @router.get("/me")
 async def get_my_profile(current_user: dict = Depends(get_current_user)):
+    return profile_summary(current_user)
+
+@router.get("/batch")
+async def get_profiles(
+    ids: List[str] = Query(..., description="Repeat ids= or pass them comma-separated"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Profiles for many users in one query, in request order; unknown ids are listed in ``missing``."""
+    user_ids = list(dict.fromkeys(user_id.strip() for value in ids for user_id in value.split(",") if user_id.strip()))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(user_ids) > settings.PROFILE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PROFILE_BATCH_MAX_IDS} ids per request")
+    
+    users = await get_repositories().users.get_many(user_ids)
     return {
-        "user_id": current_user["_id"],
-        "email": current_user["email"],
-        "role": current_user["role"]
+        "profiles": [profile_summary(users[user_id]) for user_id in user_ids if user_id in users],
+        "missing": [user_id for user_id in user_ids if user_id not in users],
     }
 
 @router.get("/")
 async def get_profile(user_id: str = Query(...), current_user: dict = Depends(get_current_user)):
-    db = get_database()
-    user = await db.users.find_one({"_id": user_id})
+    user = await get_repositories().users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Profile not found")
         
-    return {
-        "user_id": user["_id"],
-        "email": user["email"],
-        "role": user["role"]
-    }
+    return profile_summary(user)
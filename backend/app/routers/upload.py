@@ -1,21 +1,214 @@
-from fastapi import APIRouter, UploadFile, File
-import shutil
+from fastapi import APIRouter, HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.core.images import UPLOAD_DIR, schedule_derivatives
+import hashlib
+import multipart
 import os
 import uuid
 
 router = APIRouter()
 
-UPLOAD_DIR = "static/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.post("/")
-async def upload_image(file: UploadFile = File(...)):
-    file_ext = file.filename.split(".")[-1]
-    file_name = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # Return relative URL
-    return {"url": f"/static/uploads/{file_name}"}
+# Bytes of a file needed to recognise its format
+SNIFF_BYTES = 16
+# Allowance per file for the multipart boundary and part headers
+PART_OVERHEAD = 16 * 1024
+
+def sniff_image_type(head: bytes):
+    """Detect the image format from its magic bytes; the client's filename is not trusted."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def _discard(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+def _commit(tmp_path: str, final_path: str):
+    if os.path.exists(final_path):
+        # Same content already stored: keep the existing file
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+class StoredUpload:
+    """One uploaded file, written to a temporary name and hashed as its bytes arrive,
+    then stored under its SHA-256 so identical images share one file and one URL."""
+
+    def __init__(self):
+        self.tmp_path = os.path.join(UPLOAD_DIR, f".{uuid.uuid4()}.part")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.file_ext = None
+        self.buffer = None
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > settings.UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="File too large")
+        if self.buffer is None:
+            # Parts arrive in arbitrary slices: sniff once the magic bytes are all in
+            self.head += data
+            if len(self.head) < SNIFF_BYTES:
+                return
+            data, self.head = self.head, b""
+            await self._open(data)
+        self.digest.update(data)
+        await run_in_threadpool(self.buffer.write, data)
+
+    async def _open(self, head: bytes):
+        self.file_ext = sniff_image_type(head[:SNIFF_BYTES])
+        if self.file_ext is None:
+            raise HTTPException(status_code=415, detail="Unsupported image type")
+        self.buffer = await run_in_threadpool(open, self.tmp_path, "wb")
+
+    async def finish(self) -> dict:
+        if self.buffer is None:
+            if not self.head:
+                raise HTTPException(status_code=400, detail="Empty file")
+            # Shorter than the sniffing window
+            head, self.head = self.head, b""
+            await self._open(head)
+            self.digest.update(head)
+            await run_in_threadpool(self.buffer.write, head)
+        await run_in_threadpool(self.buffer.close)
+        file_name = f"{self.digest.hexdigest()}.{self.file_ext}"
+        await run_in_threadpool(_commit, self.tmp_path, os.path.join(UPLOAD_DIR, file_name))
+        # Thumbnails are produced in the background; the original is served until they exist
+        schedule_derivatives(file_name)
+        # Return relative URL
+        return {"url": f"/static/uploads/{file_name}"}
+
+    async def discard(self):
+        if self.buffer is not None:
+            await run_in_threadpool(self.buffer.close)
+            await run_in_threadpool(_discard, self.tmp_path)
+
+class UploadStream:
+    """Parses a multipart/form-data body as it is received and stores the files of one
+    field (other parts are skipped).
+
+    Starlette's form parsing spools the whole body to temporary files before the
+    endpoint runs; here each file goes straight to its StoredUpload, so an oversized
+    file is rejected as soon as it passes UPLOAD_MAX_BYTES.
+    """
+
+    def __init__(self, request: Request, field: str, max_files: int):
+        self.request = request
+        self.field = field
+        self.max_files = max_files
+        self.uploads: List[StoredUpload] = []
+        self.header_name = b""
+        self.header_value = b""
+        self.disposition = b""
+        self.current: Optional[StoredUpload] = None
+        # (upload, bytes) to write, or (upload, None) once its part has ended, in order
+        self.events: List[Tuple[StoredUpload, Optional[bytes]]] = []
+
+    def on_part_begin(self):
+        self.disposition = b""
+        self.current = None
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.header_name.lower() == b"content-disposition":
+            self.disposition = self.header_value
+        self.header_name = self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.disposition)
+        if b"filename" not in options or options.get(b"name", b"").decode("latin-1") != self.field:
+            return
+        if len(self.uploads) == self.max_files:
+            raise HTTPException(status_code=400, detail=f"At most {self.max_files} files per request")
+        self.current = StoredUpload()
+        self.uploads.append(self.current)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.current is not None:
+            self.events.append((self.current, data[start:end]))
+
+    def on_part_end(self):
+        if self.current is not None:
+            self.events.append((self.current, None))
+
+    async def parse(self) -> List[dict]:
+        content_type, params = parse_options_header(self.request.headers.get("content-type", ""))
+        if content_type.lower() != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+        content_length = self.request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_files * (settings.UPLOAD_MAX_BYTES + PART_OVERHEAD):
+            # Too large whatever it holds: refuse before reading any of it
+            raise HTTPException(status_code=413, detail="File too large")
+
+        parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        })
+        results = []
+        try:
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+                # File writes run in the threadpool, so the callbacks only queue them
+                for upload, data in self.events:
+                    if data is None:
+                        results.append(await upload.finish())
+                    else:
+                        await upload.write(data)
+                self.events.clear()
+            parser.finalize()
+        except MultipartParseError:
+            await self._discard_unfinished(len(results))
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        except BaseException:
+            await self._discard_unfinished(len(results))
+            raise
+        if len(results) < len(self.uploads):
+            # The body ended inside a file part
+            await self._discard_unfinished(len(results))
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        if not results:
+            raise HTTPException(status_code=422, detail=f"Field required: {self.field}")
+        return results
+
+    async def _discard_unfinished(self, finished: int):
+        for upload in self.uploads[finished:]:
+            await upload.discard()
+
+def upload_body(field: str, multiple: bool) -> dict:
+    # The endpoints read the body themselves, so describe it for the OpenAPI docs
+    file_schema = {"type": "string", "format": "binary"}
+    schema = {"type": "array", "items": file_schema} if multiple else file_schema
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": {field: schema}, "required": [field],
+    }}}}}
+
+@router.post("/", openapi_extra=upload_body("file", multiple=False))
+async def upload_image(request: Request):
+    return (await UploadStream(request, "file", 1).parse())[0]
+
+@router.post("/batch", openapi_extra=upload_body("files", multiple=True))
+async def upload_images(request: Request):
+    return {"files": await UploadStream(request, "files", settings.UPLOAD_MAX_FILES).parse()}
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.deps import get_current_user
-from app.core.database import get_database
+from app.core.database import get_repositories
+from app.core.cache import user_cache
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -19,9 +20,9 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
 
 @router.put("/role")
 async def update_role(role_data: UserRoleUpdate, current_user: dict = Depends(get_current_user)):
-    db = get_database()
     if role_data.role not in ["renter", "provider"]:
          raise HTTPException(status_code=400, detail="Invalid role")
     
-    await db.users.update_one({"_id": current_user["_id"]}, {"$set": {"role": role_data.role}})
+    await get_repositories().users.update(current_user["_id"], {"role": role_data.role})
+    user_cache.invalidate(current_user["_id"])
     return {"message": "Role updated", "role": role_data.role}
@@ -17,6 +17,11 @@ class Token(BaseModel):
     token_type: str
     user_id: str
 
+class ProfileSummary(BaseModel):
+    user_id: str
+    email: str
+    role: str
+
 class UserProfile(MongoBaseModel):
     email: EmailStr
     role: str
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
+from .auth import ProfileSummary
 from .common import MongoBaseModel
 
 class BookingCreate(BaseModel):
@@ -15,3 +16,9 @@ class BookingResponse(MongoBaseModel):
     end_time: datetime
     status: str
     created_at: datetime
+    price_per_hour: Optional[float] = None
+    amount: Optional[float] = None
+
+class BookingExpandedResponse(BookingResponse):
+    owner: Optional[ProfileSummary] = None
+    renter: Optional[ProfileSummary] = None
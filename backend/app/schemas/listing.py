@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import Dict, List, Optional
 from datetime import datetime
+from .auth import ProfileSummary
 from .common import MongoBaseModel, PyObjectId
+from app.core.images import variant_urls
 
 class ListingBase(BaseModel):
     title: str
@@ -10,8 +12,8 @@ class ListingBase(BaseModel):
     city: Optional[str] = None
     price_per_hour: float
     vehicle_size: str = "Compact" # Compact, SUV, EV
-    latitude: Optional[float] = None
-    longitude: Optional[float] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     images: List[str] = []
 
 class ListingCreate(ListingBase):
@@ -24,11 +26,28 @@ class ListingUpdate(BaseModel):
     city: Optional[str] = None
     price_per_hour: Optional[float] = None
     vehicle_size: Optional[str] = None
-    latitude: Optional[float] = None
-    longitude: Optional[float] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     images: Optional[List[str]] = None
 
+class QuoteRequest(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    listing_ids: List[str] = Field(..., min_length=1)
+
 class ListingResponse(ListingBase, MongoBaseModel):
     owner_id: str
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def image_variants(self) -> List[Dict[str, str]]:
+        # Parallel to `images`: {"original", "thumb", "medium"} URLs per image
+        return [variant_urls(url) for url in self.images]
+
+class ListingExpandedResponse(ListingResponse):
+    owner: Optional[ProfileSummary] = None
+
+class ListingNearbyResponse(ListingResponse):
+    distance_m: float
@@ -0,0 +1,108 @@
+"""
+Benchmark: API responsiveness while logins are hashing passwords
+Runs the app in-process on a throwaway SQLite store, fires concurrent logins (each an
+argon2 verification) and meanwhile polls GET /healthz, whose latency is how long a
+request waits for the event loop. The same load is then repeated with verification
+run on the event loop, as it was before the hashing pool, for comparison. Probes are
+timed from when they are due, so a loop blocked by hashing shows up as probe latency.
+
+Exits non-zero when the /healthz p99 under pooled hashing exceeds --max-p99-ms.
+
+Run from backend/: python -m benchmarks.bench_auth_responsiveness [--logins 20] [--max-p99-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+# Configure before the app reads its settings: no database server, and neither the
+# rate limits nor the in-flight cap may turn logins away
+os.environ.update({
+    "STORAGE_BACKEND": "sqlite",
+    "DATABASE_URL": "sqlite:///:memory:",
+    "AUTH_MAX_IN_FLIGHT": "0",
+    "AUTH_RATE_LIMIT_IP_BURST": "1000000",
+    "AUTH_RATE_LIMIT_EMAIL_BURST": "1000000",
+})
+
+import httpx
+from app.core import security
+from app.core.config import settings
+from app.core.database import close_storage, connect_storage
+from app.main import app
+from app.routers import auth
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+PROBE_INTERVAL = 0.002
+
+async def verify_on_loop(plain_password: str, hashed_password: str):
+    # What login did before the hashing pool: argon2 straight on the event loop
+    return security.pwd_context.verify_and_update(plain_password, hashed_password)
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def probe(client: httpx.AsyncClient, done: asyncio.Event, latencies: List[float]):
+    # Timed from when each probe is due, so time spent waiting for a blocked loop counts
+    while not done.is_set():
+        due = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        response = await client.get("/healthz")
+        latencies.append(time.perf_counter() - due)
+        assert response.status_code == 200
+
+async def run(client: httpx.AsyncClient, logins: int) -> dict:
+    done = asyncio.Event()
+    latencies: List[float] = []
+    prober = asyncio.create_task(probe(client, done, latencies))
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        client.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD}) for _ in range(logins)
+    ))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+    assert all(response.status_code == 200 for response in responses), [r.status_code for r in responses]
+    return {
+        "elapsed": elapsed,
+        "probes": len(latencies),
+        "p50": percentile(latencies, 50) * 1e3,
+        "p99": percentile(latencies, 99) * 1e3,
+        "max": max(latencies) * 1e3,
+    }
+
+async def main(logins: int, max_p99_ms: float) -> bool:
+    await connect_storage()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/auth/register", json={"email": EMAIL, "password": PASSWORD, "role": "renter"})
+            assert response.status_code == 200, response.text
+            results = {"hashing pool": await run(client, logins)}
+            pooled = auth.verify_and_update_password_async
+            auth.verify_and_update_password_async = verify_on_loop
+            try:
+                results["on event loop"] = await run(client, logins)
+            finally:
+                auth.verify_and_update_password_async = pooled
+    finally:
+        await close_storage()
+
+    print(f"{logins} concurrent logins, PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}; GET /healthz latency (ms)")
+    print(f"{'hashing':<16}{'logins s':>10}{'probes':>8}{'p50':>9}{'p99':>9}{'max':>9}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['elapsed']:>10.2f}{result['probes']:>8}{result['p50']:>9.2f}{result['p99']:>9.2f}{result['max']:>9.2f}")
+    ok = results["hashing pool"]["p99"] <= max_p99_ms
+    print(f"{'✅' if ok else '❌'} p99 with the hashing pool {results['hashing pool']['p99']:.2f} ms (bound {max_p99_ms} ms)")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20, help="concurrent logins")
+    parser.add_argument("--max-p99-ms", type=float, default=50.0, help="fail above this /healthz p99")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.logins, args.max_p99_ms)) else 1)
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark: hot-path overhead of request metrics
+Times a minimal ASGI app called directly, with and without MetricsMiddleware,
+plus the raw cost of a histogram observation.
+
+Run from backend/: python -m benchmarks.bench_metrics
+"""
+import asyncio
+import time
+from app.core.metrics import Histogram, MetricsMiddleware
+
+class _Route:
+    path = "/api/listings/{id}"
+
+async def bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+async def time_app(app, runs: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/listings/abc"}
+    start = time.perf_counter()
+    for _ in range(runs):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / runs
+
+def main():
+    runs = 200_000
+    bare = min(asyncio.run(time_app(bare_app, runs)) for _ in range(3))
+    wrapped = min(asyncio.run(time_app(MetricsMiddleware(bare_app), runs)) for _ in range(3))
+
+    histogram = Histogram("bench_seconds", "bench", ("route",))
+    start = time.perf_counter()
+    for i in range(runs):
+        histogram.observe(0.003, "/x")
+    observe = (time.perf_counter() - start) / runs
+
+    print(f"bare app:          {bare * 1e6:6.2f} µs/request")
+    print(f"with metrics:      {wrapped * 1e6:6.2f} µs/request")
+    print(f"middleware cost:   {(wrapped - bare) * 1e6:6.2f} µs/request")
+    print(f"histogram.observe: {observe * 1e6:6.2f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Micro-benchmark: CPU cost of quoting one window for many listings
+Compares a per-listing loop (what one quote_amount call per listing costs) with the
+single vectorized quote_amounts pass behind POST /api/listings/quotes.
+
+Run from backend/: python -m benchmarks.bench_quotes [listings]
+"""
+import sys
+import timeit
+from datetime import datetime
+import numpy as np
+from app.core.pricing import quote_amount, quote_amounts
+
+START = datetime(2025, 6, 6, 7, 30)
+END = datetime(2025, 6, 8, 19, 15)
+
+def per_listing(prices):
+    return [quote_amount(price, START, END) for price in prices.tolist()]
+
+def vectorized(prices):
+    return quote_amounts(prices, START, END).tolist()
+
+def main():
+    listings = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    prices = np.random.default_rng(0).uniform(20, 200, listings).round(2)
+    assert per_listing(prices) == vectorized(prices)
+
+    for name, fn, runs in (("loop", per_listing, 3), ("numpy", vectorized, 200)):
+        best = min(timeit.repeat(lambda: fn(prices), number=runs, repeat=5)) / runs
+        print(f"{name:>6}: {best * 1e3:8.3f} ms per {listings} listings  ({best / listings * 1e6:6.2f} µs/listing)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark: per-row CPU cost of building list responses
+Compares the original path (dict copy + validation, then FastAPI's response_model
+re-validation and jsonable_encoder) with model_construct + pydantic-core dump_json.
+
+Run from backend/: python -m benchmarks.bench_serialization [rows]
+"""
+import hashlib
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.core.serialization import from_documents
+from app.schemas.listing import ListingResponse
+
+def make_documents(rows: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": str(uuid.uuid4()),
+            "owner_id": str(uuid.uuid4()),
+            "title": f"Parking spot {i}",
+            "description": "Covered parking near the station",
+            "address": f"{i} Main Street",
+            "city": "Mumbai",
+            "price_per_hour": 40.0 + i % 20,
+            "vehicle_size": "Compact",
+            "latitude": 19.07,
+            "longitude": 72.87,
+            # Half external images, half uploads (which get thumb/medium variant URLs)
+            "images": (
+                ["https://images.unsplash.com/photo-1590674899484-d5640e854abe?w=800"] if i % 2 else
+                [f"/static/uploads/{hashlib.sha256(str(i).encode()).hexdigest()}.jpg"]
+            ),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ]
+
+adapter = TypeAdapter(List[ListingResponse])
+
+def original_path(docs):
+    items = [ListingResponse(**{**doc, "id": doc["_id"]}) for doc in docs]
+    # What FastAPI does with a response_model: validate again, then encode
+    validated = adapter.validate_python(items, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+def fast_path(docs):
+    # from_documents consumes _id, so hand it shallow copies (as a fresh DB batch would be)
+    return adapter.dump_json(from_documents(ListingResponse, [dict(doc) for doc in docs]))
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    docs = make_documents(rows)
+    assert json.loads(original_path(docs)) == json.loads(fast_path(docs))
+
+    for name, fn in (("original", original_path), ("fast", fast_path)):
+        runs = 200
+        best = min(timeit.repeat(lambda: fn(docs), number=runs, repeat=5)) / runs
+        print(f"{name:>8}: {best * 1e3:8.3f} ms per {rows} rows  ({best / rows * 1e6:6.2f} µs/row)")
+
+if __name__ == "__main__":
+    main()
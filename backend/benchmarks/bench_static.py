@@ -0,0 +1,99 @@
+"""
+Benchmark: upload serving throughput, plain StaticFiles mount vs UploadStaticFiles
+Drives both ASGI apps in-process (no sockets, so only the worker's cost is measured) with
+concurrent GETs of content-addressed images: full downloads, Range requests and
+revalidations (If-None-Match). The server here offers no zero-copy extension, so the
+new mount reads files itself; behind nginx with STATIC_ACCEL_REDIRECT_PREFIX the body
+never reaches the worker at all. Before timing, it checks that a Range with If-Range
+carrying the advertised ETag is answered with 206.
+
+Run from backend/: python -m benchmarks.bench_static [requests] [concurrency]
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from starlette.staticfiles import StaticFiles
+from app.core.static_files import UploadStaticFiles
+
+# Typical thumb, medium variant and original sizes
+SIZES = {"thumb": 20 * 1024, "medium": 150 * 1024, "original": 2 * 1024 * 1024}
+
+def make_files(directory: str) -> dict:
+    names = {}
+    for label, size in SIZES.items():
+        data = os.urandom(size)
+        name = f"{hashlib.sha256(data).hexdigest()}.jpg"
+        with open(os.path.join(directory, name), "wb") as file:
+            file.write(data)
+        names[label] = name
+    return names
+
+async def request(app, path: str, headers, method: str = "GET") -> dict:
+    """One request straight into the ASGI app; returns the response headers (and status)."""
+    response = {}
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http", "path": path,
+        "root_path": "", "query_string": b"", "headers": headers, "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.update((name.decode(), value.decode()) for name, value in message["headers"])
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response
+
+async def run(app, path: str, headers, requests: int, concurrency: int) -> float:
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await request(app, path, headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+async def check_if_range(app, path: str):
+    """Resumed downloads: a Range with If-Range carrying the advertised ETag gets 206,
+    one carrying any other validator gets the whole file."""
+    etag = (await request(app, path, [], "HEAD"))["etag"]
+    resumed = await request(app, path, [(b"range", b"bytes=0-1023"), (b"if-range", etag.encode())])
+    assert resumed["status"] == 206, resumed
+    stale = await request(app, path, [(b"range", b"bytes=0-1023"), (b"if-range", b'"stale"')])
+    assert stale["status"] == 200, stale
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    directory = tempfile.mkdtemp()
+    names = make_files(directory)
+    apps = {"plain": StaticFiles(directory=directory), "upload": UploadStaticFiles(directory=directory)}
+    await check_if_range(apps["upload"], f"/{names['original']}")
+
+    scenarios = [(f"GET {label}", f"/{name}", lambda etag: []) for label, name in names.items()]
+    scenarios.append(("Range 64 KiB of original", f"/{names['original']}", lambda etag: [(b"range", b"bytes=0-65535")]))
+    # Each mount revalidates against its own ETag (the plain one hashes mtime and size)
+    scenarios.append(("304 revalidate thumb", f"/{names['thumb']}", lambda etag: [(b"if-none-match", etag.encode())]))
+
+    print(f"{requests} requests per scenario, concurrency {concurrency} (requests/s)")
+    print(f"{'scenario':<28}{'plain':>10}{'upload':>10}{'speedup':>9}")
+    for label, path, headers_for in scenarios:
+        rates = {}
+        for app_name, app in apps.items():
+            head = await request(app, path, [], "HEAD")
+            assert head["status"] == 200
+            rates[app_name] = await run(app, path, headers_for(head["etag"]), requests, concurrency)
+        print(f"{label:<28}{rates['plain']:>10.0f}{rates['upload']:>10.0f}{rates['upload'] / rates['plain']:>8.2f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,356 @@
+"""
+Load test: drive mixed API traffic against a locally started server and report
+throughput and p50/p95/p99 latency per route
+
+By default a throwaway `mongod` (from PATH or --mongod) is started in a temp directory,
+the API is started with uvicorn on a free port, seeded, and then exercised with a
+seeded-random mix of register/login, listing search, listing detail and booking
+create/cancel. Everything runs on the local machine with no network access.
+With --sqlite the API uses the embedded SQLite backend on a temp file instead of MongoDB.
+
+Run from backend/:
+    python -m benchmarks.load_test --duration 30 --out bench_results.json
+    python -m benchmarks.load_test --sqlite --out bench_sqlite.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json --max-regression 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import httpx
+
+CITIES = ["Mumbai", "Pune", "Delhi", "Bengaluru", "Chennai", "Hyderabad", "Kolkata", "Jaipur"]
+VEHICLE_SIZES = ["Compact", "SUV", "EV"]
+PASSWORD = "bench-password"
+
+# Relative weight of each scenario in the traffic mix
+MIX = {
+    "search": 40,
+    "detail": 35,
+    "booking": 15,
+    "login": 7,
+    "register": 3,
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for(check, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {what}")
+
+@contextmanager
+def local_mongod(binary: str):
+    port = free_port()
+    dbpath = tempfile.mkdtemp(prefix="smartpark-bench-")
+    proc = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        def ready():
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        wait_for(ready, 30, "mongod")
+        yield f"mongodb://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+@contextmanager
+def existing_mongodb(uri: str, db_name: str):
+    try:
+        yield uri
+    finally:
+        # Leave the shared server as we found it
+        from pymongo import MongoClient
+        with MongoClient(uri) as client:
+            client.drop_database(db_name)
+
+@contextmanager
+def local_sqlite():
+    directory = tempfile.mkdtemp(prefix="smartpark-bench-")
+    try:
+        yield {"STORAGE_BACKEND": "sqlite", "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}"}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+@contextmanager
+def api_server(env: Dict[str, str], workers: int):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        # Every virtual client shares one IP, so per-client auth limits would only measure themselves
+        env={**os.environ, "AUTH_RATE_LIMIT_IP_BURST": "0", "AUTH_RATE_LIMIT_EMAIL_BURST": "0", **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(lambda: httpx.get(base_url + "/").status_code == 200, 60, "API server")
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][response.status_code] += 1
+        return response
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, dict]:
+    routes = {}
+    for name, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        statuses = dict(recorder.statuses[name])
+        routes[name] = {
+            "count": len(values),
+            "errors": sum(count for status, count in statuses.items() if status >= 500),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1e3, 3),
+            "p95_ms": round(percentile(values, 95) * 1e3, 3),
+            "p99_ms": round(percentile(values, 99) * 1e3, 3),
+        }
+    return routes
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.listing_ids: List[str] = []
+        self.renters: List[dict] = []  # {"email", "headers"}
+        self.counter = 0
+
+    async def register(self, role: str, name: str = "POST /api/auth/register") -> dict:
+        self.counter += 1
+        email = f"bench-{role}-{self.counter}-{self.rng.getrandbits(32):08x}@example.com"
+        response = await self.recorder.request(
+            self.client, name, "POST", "/api/auth/register",
+            json={"email": email, "password": PASSWORD, "role": role},
+        )
+        if name == "seed":
+            response.raise_for_status()
+        elif response.status_code != 200:
+            # Shed by admission control under load; recorded, nothing to keep
+            return None
+        return {"email": email, "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
+
+    async def seed(self, providers: int, listings: int, renters: int):
+        provider_accounts = [await self.register("provider", "seed") for _ in range(providers)]
+        per_provider = max(1, listings // providers)
+        for account in provider_accounts:
+            rows = "\n".join(
+                json.dumps({
+                    "title": f"Bench spot {i}",
+                    "description": self.rng.choice(["Covered parking near station", "Open lot", "Basement with CCTV"]),
+                    "address": f"{i} Bench Road",
+                    "city": self.rng.choice(CITIES),
+                    "price_per_hour": self.rng.randint(10, 100),
+                    "vehicle_size": self.rng.choice(VEHICLE_SIZES),
+                    "latitude": 19.0 + self.rng.random(),
+                    "longitude": 72.8 + self.rng.random(),
+                })
+                for i in range(per_provider)
+            )
+            response = await self.client.post(
+                "/api/listings/import", content=rows.encode(),
+                headers={**account["headers"], "Content-Type": "application/x-ndjson"},
+            )
+            response.raise_for_status()
+            self.listing_ids.extend(r["id"] for r in response.json()["results"] if r["status"] == "created")
+        self.renters = [await self.register("renter", "seed") for _ in range(renters)]
+
+    async def search(self):
+        params = {"limit": self.rng.choice([20, 50])}
+        if self.rng.random() < 0.7:
+            params["city"] = self.rng.choice(CITIES)
+        if self.rng.random() < 0.3:
+            params["vehicle_size"] = self.rng.choice(VEHICLE_SIZES)
+        if self.rng.random() < 0.3:
+            params["sort"] = self.rng.choice(["price", "-price", "newest"])
+        await self.recorder.request(self.client, "GET /api/listings/", "GET", "/api/listings/", params=params)
+
+    async def detail(self):
+        listing_id = self.rng.choice(self.listing_ids)
+        await self.recorder.request(self.client, "GET /api/listings/{id}", "GET", f"/api/listings/{listing_id}")
+
+    async def booking(self):
+        renter = self.rng.choice(self.renters)
+        start = datetime(2030, 1, 1) + timedelta(hours=self.rng.randint(0, 24 * 365))
+        response = await self.recorder.request(
+            self.client, "POST /api/bookings/", "POST", "/api/bookings/",
+            headers=renter["headers"],
+            json={
+                "listing_id": self.rng.choice(self.listing_ids),
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=self.rng.randint(1, 4))).isoformat(),
+            },
+        )
+        if response.status_code == 200:
+            await self.recorder.request(
+                self.client, "DELETE /api/bookings/{id}", "DELETE", f"/api/bookings/{response.json()['id']}",
+                headers=renter["headers"],
+            )
+
+    async def login(self):
+        renter = self.rng.choice(self.renters)
+        await self.recorder.request(
+            self.client, "POST /api/auth/login", "POST", "/api/auth/login",
+            json={"email": renter["email"], "password": PASSWORD},
+        )
+
+    async def run(self, duration: float, concurrency: int) -> float:
+        scenarios = [getattr(self, name) for name in MIX]
+        weights = list(MIX.values())
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            while time.monotonic() < deadline:
+                scenario = self.rng.choices(scenarios, weights)[0]
+                if scenario == self.register:
+                    await self.register("renter")
+                else:
+                    await scenario()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+def compare(results: dict, baseline: dict, max_regression: Optional[float]) -> bool:
+    """Print per-route deltas against a baseline; False if any latency percentile
+    regressed by more than ``max_regression`` percent."""
+    ok = True
+    print(f"\n{'route':<28}{'metric':>8}{'baseline':>12}{'current':>12}{'delta':>10}")
+    for route, current in results["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if base is None:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            before, after = base[metric], current[metric]
+            delta = (after - before) / before * 100 if before else 0.0
+            regressed = (
+                max_regression is not None and metric != "rps" and delta > max_regression
+            )
+            ok = ok and not regressed
+            flag = " ❌" if regressed else ""
+            print(f"{route:<28}{metric:>8}{before:>12.2f}{after:>12.2f}{delta:>9.1f}%{flag}")
+    return ok
+
+async def drive(base_url: str, args) -> dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        workload = Workload(client, recorder, rng)
+        await workload.seed(args.providers, args.listings, args.renters)
+        # Warm caches and connection pools, then measure from a clean recorder
+        await workload.run(min(5.0, args.duration / 5), args.concurrency)
+        workload.recorder = recorder = Recorder()
+        elapsed = await workload.run(args.duration, args.concurrency)
+
+    routes = summarize(recorder, elapsed)
+    total = sum(route["count"] for route in routes.values())
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "duration_s": round(elapsed, 3),
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "backend": "sqlite" if args.sqlite else "mongo",
+            "seed": args.seed,
+            "listings": args.listings,
+            "mix": MIX,
+        },
+        "total_rps": round(total / elapsed, 2),
+        "routes": routes,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartPark API load test")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds of traffic")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent virtual clients")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for data and traffic")
+    parser.add_argument("--providers", type=int, default=10)
+    parser.add_argument("--listings", type=int, default=5000)
+    parser.add_argument("--renters", type=int, default=50)
+    parser.add_argument("--mongod", default=shutil.which("mongod"), help="mongod binary for a throwaway database")
+    parser.add_argument("--mongodb-uri", help="Use this MongoDB instead of starting mongod")
+    parser.add_argument("--sqlite", action="store_true", help="Use the embedded SQLite backend instead of MongoDB")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write JSON results")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--max-regression", type=float, help="Fail if a latency percentile regresses by more than this %%")
+    args = parser.parse_args()
+
+    db_name = f"smartpark_bench_{args.seed}_{int(time.time())}"
+    if args.sqlite:
+        database = local_sqlite()
+    elif args.mongodb_uri:
+        database = existing_mongodb(args.mongodb_uri, db_name)
+    elif args.mongod:
+        database = local_mongod(args.mongod)
+    else:
+        parser.error("mongod not found on PATH; pass --mongod, --mongodb-uri or --sqlite")
+
+    with database as target:
+        env = target if args.sqlite else {"MONGODB_URI": target, "MONGODB_DB": db_name}
+        with api_server(env, args.workers) as base_url:
+            results = asyncio.run(drive(base_url, args))
+
+    print(f"\nTotal throughput: {results['total_rps']} req/s over {results['meta']['duration_s']}s")
+    print(f"{'route':<28}{'count':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'5xx':>6}")
+    for route, stats in results["routes"].items():
+        print(f"{route:<28}{stats['count']:>8}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['errors']:>6}")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Check that availability search stays right when bookings meet inside a minute: two
+bookings may share a minute slot (one ends 10:00:30, the next starts then), and
+cancelling either must leave the other's slot set
+Runs against a scratch database next to the configured one (dropped afterwards):
+python check_occupancy.py
+Or against the SQLite backend (in-memory): python check_occupancy.py --sqlite
+"""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta
+from app.core.availability import slot_masks
+from app.core.config import settings
+from app.core.database import close_storage, connect_storage, get_database, get_repositories
+
+def booking(listing_id: str, start: datetime, end: datetime) -> dict:
+    return {
+        "_id": str(uuid.uuid4()), "listing_id": listing_id, "renter_id": "check-renter",
+        "start_time": start, "end_time": end, "status": "active", "created_at": datetime.utcnow(),
+        "owner_id": "check-owner", "price_per_hour": 10.0, "amount": 10.0,
+    }
+
+async def busy(listing_id: str, start: datetime, end: datetime) -> bool:
+    return listing_id in await get_repositories().bookings.busy_listings([listing_id], slot_masks(start, end))
+
+async def check() -> int:
+    bookings = get_repositories().bookings
+    listing_id = str(uuid.uuid4())
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    meet = day + timedelta(hours=10, seconds=30)
+    first = booking(listing_id, day + timedelta(hours=9), meet)
+    second = booking(listing_id, meet, day + timedelta(hours=11))
+    # Windows inside the shared minute, before it (first only) and after it (second only)
+    shared = (day + timedelta(hours=10, seconds=40), day + timedelta(hours=10, seconds=50))
+    before = (day + timedelta(hours=9, minutes=30), day + timedelta(hours=9, minutes=31))
+    after = (day + timedelta(hours=10, minutes=30), day + timedelta(hours=10, minutes=31))
+
+    failures = 0
+    def expect(label: str, actual: bool, expected: bool):
+        nonlocal failures
+        ok = actual == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    expect("both bookings accepted", await bookings.create(first) and await bookings.create(second), True)
+    expect("shared minute busy", await busy(listing_id, *shared), True)
+    await bookings.cancel(first)
+    expect("shared minute still busy after cancelling the first", await busy(listing_id, *shared), True)
+    expect("first booking's time free after cancelling it", await busy(listing_id, *before), False)
+    expect("second booking's time still busy", await busy(listing_id, *after), True)
+    await bookings.cancel(second)
+    expect("shared minute free after cancelling both", await busy(listing_id, *shared), False)
+    return failures
+
+async def main() -> int:
+    if "--sqlite" in sys.argv[1:]:
+        settings.STORAGE_BACKEND, settings.DATABASE_URL = "sqlite", "sqlite:///:memory:"
+    else:
+        settings.STORAGE_BACKEND, settings.MONGODB_DB = "mongo", f"{settings.MONGODB_DB}_occupancy_check"
+    await connect_storage()
+    try:
+        return await check()
+    finally:
+        if settings.STORAGE_BACKEND == "mongo":
+            await get_database().client.drop_database(settings.MONGODB_DB)
+        await close_storage()
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main()) else 0)
@@ -0,0 +1,81 @@
+"""
+Check that every supported listing browse filter/sort combination is answered by an
+index range scan in sort order (no COLLSCAN, no in-memory SORT stage), both for the
+first page and for a page continued from a keyset cursor
+Run against a MongoDB you can create indexes on: python check_query_plans.py
+Or check the SQLite backend's plans (in-memory): python check_query_plans.py --sqlite
+"""
+import asyncio
+import itertools
+import sys
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import settings
+from app.core.indexes import ensure_indexes, CASE_INSENSITIVE
+from app.core.pagination import encode_cursor, page_query
+from app.repositories.base import ListingFilters, LISTING_SORTS
+from app.repositories.mongo import build_browse_query
+
+def plan_stages(plan: dict):
+    yield plan
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+FILTERS = list(itertools.product(
+    [None, "Mumbai"],             # city
+    [None, "SUV"],                # vehicle_size
+    [(None, None), (20, None), (None, 80), (20, 80)],  # price range
+))
+
+# Last row of a previous page, to build the cursor of a continuation query from
+LAST_ROW = {"_id": "7f0c2a9e-8a4b-4d8e-9a51-0c3f1b6d2e47", "created_at": datetime(2024, 6, 1, 12, 0), "price_per_hour": 50.0}
+
+PAGES = ["first", "after cursor"]
+
+def page_cursor(sort, page: str):
+    return encode_cursor(sort, LAST_ROW) if page == "after cursor" else None
+
+async def check():
+    client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
+    db = client[settings.MONGODB_DB]
+    await ensure_indexes(db)
+
+    failures = 0
+    for (city, vehicle_size, (min_price, max_price)), sort, page in itertools.product(FILTERS, LISTING_SORTS, PAGES):
+        cursor = page_cursor(LISTING_SORTS[sort], page)
+        query = page_query(build_browse_query(ListingFilters(city, vehicle_size, min_price, max_price)), LISTING_SORTS[sort], cursor)
+        explain = await db.listings.find(query, collation=CASE_INSENSITIVE).sort(LISTING_SORTS[sort]).limit(51).explain()
+        stages = list(plan_stages(explain["queryPlanner"]["winningPlan"]))
+        names = [stage.get("stage") for stage in stages]
+        index = next((stage.get("indexName") for stage in stages if stage.get("stage") == "IXSCAN"), None)
+        ok = index is not None and "SORT" not in names and "COLLSCAN" not in names
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} city={city} vehicle_size={vehicle_size} price=[{min_price}, {max_price}] sort={sort} page={page}: {' <- '.join(names)} ({index})")
+
+    client.close()
+    return failures
+
+async def check_sqlite():
+    from app.repositories.sqlite import LISTING_COLUMNS, SQLiteStore, _listing_where, _page_sql
+    store = SQLiteStore(":memory:")
+    await store.open()
+
+    failures = 0
+    for (city, vehicle_size, (min_price, max_price)), sort, page in itertools.product(FILTERS, LISTING_SORTS, PAGES):
+        where, params = _listing_where(ListingFilters(city, vehicle_size, min_price, max_price), price_sorted=sort != "newest")
+        sql, params = _page_sql("listings", LISTING_COLUMNS, where, params, LISTING_SORTS[sort], 50, page_cursor(LISTING_SORTS[sort], page))
+        rows = await store.run(lambda: store.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+        details = [row["detail"] for row in rows]
+        ok = any("USING INDEX" in detail for detail in details) and not any("TEMP B-TREE" in detail for detail in details)
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} city={city} vehicle_size={vehicle_size} price=[{min_price}, {max_price}] sort={sort} page={page}: {' | '.join(details)}")
+
+    await store.close()
+    return failures
+
+if __name__ == "__main__":
+    run = check_sqlite if "--sqlite" in sys.argv[1:] else check
+    sys.exit(1 if asyncio.run(run()) else 0)
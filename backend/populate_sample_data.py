@@ -121,6 +121,10 @@ async def populate_sample_data():
         }
     ]
     
+    # GeoJSON point used by the 2dsphere index ([lng, lat] order)
+    for listing in sample_listings:
+        listing["location"] = {"type": "Point", "coordinates": [listing["longitude"], listing["latitude"]]}
+    
     await db.listings.insert_many(sample_listings)
     
     print("✅ Sample data populated successfully!")
@@ -133,6 +137,7 @@ async def populate_sample_data():
     await db.users.create_index("email", unique=True)
     await db.listings.create_index("owner_id")
     await db.listings.create_index("city")
+    await db.listings.create_index([("location", "2dsphere")])
     await db.bookings.create_index("renter_id")
     await db.bookings.create_index("listing_id")
     
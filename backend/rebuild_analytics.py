@@ -0,0 +1,19 @@
+"""
+Script to recompute provider analytics rollups from raw bookings
+Run this after restoring data, or if rollups drifted (e.g. a rollup write failed)
+"""
+import asyncio
+from app.core.analytics import rebuild_rollups
+from app.core.database import connect_storage, close_storage, get_repositories
+
+async def rebuild():
+    await connect_storage()
+    try:
+        print("📊 Rebuilding listing analytics from bookings...")
+        bookings, rollups = await rebuild_rollups(get_repositories())
+        print(f"✅ Rebuilt {rollups} listing-day rollups from {bookings} bookings")
+    finally:
+        await close_storage()
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -0,0 +1,19 @@
+"""
+Script to recompute the availability bitmaps used by listing search (start/end)
+Run this once after upgrading, after restoring data, or if search drifted from bookings
+"""
+import asyncio
+from app.core.availability import rebuild_occupancy
+from app.core.database import connect_storage, close_storage, get_repositories
+
+async def rebuild():
+    await connect_storage()
+    try:
+        print("📅 Rebuilding listing availability from active bookings...")
+        bookings, bitmaps = await rebuild_occupancy(get_repositories())
+        print(f"✅ Rebuilt {bitmaps} listing-day bitmaps from {bookings} active bookings")
+    finally:
+        await close_storage()
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
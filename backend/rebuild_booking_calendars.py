@@ -0,0 +1,23 @@
+"""
+Script to recompute the MongoDB booking calendars that guard against overlapping bookings
+Startup already creates missing calendars; run this after restoring data or if calendars
+drifted from bookings, while no bookings are being made
+"""
+import asyncio
+from app.core.config import settings
+from app.core.database import connect_storage, close_storage, get_repositories
+
+async def rebuild():
+    if settings.STORAGE_BACKEND != "mongo":
+        print("ℹ️ SQLite checks overlaps against the bookings table; nothing to rebuild")
+        return
+    await connect_storage()
+    try:
+        print("📅 Rebuilding booking calendars from active bookings...")
+        bookings, calendars = await get_repositories().bookings.rebuild_calendars(replace=True)
+        print(f"✅ Rebuilt {calendars} booking calendars from {bookings} active bookings")
+    finally:
+        await close_storage()
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
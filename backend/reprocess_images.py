@@ -0,0 +1,38 @@
+"""
+Script to (re)generate thumbnail and medium variants for uploaded images
+Run this to backfill variants for uploads made before the derivative pipeline existed
+--force rewrites variants in place under the same URL, which clients and CDNs cache as
+immutable: only use it for variants that were never served, or purge them afterwards
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.core.config import settings
+from app.core.images import UPLOAD_DIR, generate_derivatives, is_variant_file
+
+def reprocess(force: bool):
+    paths = [
+        os.path.join(UPLOAD_DIR, name)
+        for name in sorted(os.listdir(UPLOAD_DIR))
+        if not name.startswith(".") and not is_variant_file(name)
+    ]
+    print(f"🖼️  Processing {len(paths)} uploads...")
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS) as executor:
+        futures = {executor.submit(generate_derivatives, path, force): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                written += len(future.result())
+            except Exception as e:
+                print(f"❌ {futures[future]}: {e}")
+
+    print(f"✅ Wrote {written} variants")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate image variants for uploads")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Regenerate variants that already exist (in place: cached copies are not refreshed)"
+    )
+    reprocess(parser.parse_args().force)